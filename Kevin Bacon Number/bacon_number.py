@@ -1,4 +1,13 @@
-from collections import deque
+import json
+import os
+from collections import OrderedDict
+from bacon_table import BaconTable
+from cast_graph import CastGraph
+from components import ComponentIndex
+from graph_index import load_index, save_index
+from landmarks import LandmarkOracle
+from neighborhood import kHop
+from tree_cache import TreeCache
 import random
 random.seed(17)
 
@@ -10,24 +19,69 @@ class BaconNumberCalculator:
     ----------
     fileName : str
         The name of the file containing the movie data.
+    indexName : str, optional
+        A binary index file caching the parsed graph (default is None, always parse).
+    cacheSize : int, optional
+        How many source actors' search trees to keep (default is 0, no cache).
+    journalName : str, optional
+        A file recording every add_movie/remove_movie, replayed on start-up
+        (default is None, changes are not recorded).
+    tableCacheSize : int, optional
+        How many Bacon tables from baconTable to keep (default is 8).
 
     Attributes
     ----------
-    adjList : dict of dict/dict of list/ dict of tuple/etc...
+    graph : CastGraph
+        The bipartite actor-movie graph, with names interned to integer IDs.
+    adjList : AdjacencyView
+        A read-only dict-like view of ``graph`` keyed by actor name.
+    components : ComponentIndex
+        The connected components and degree statistics, labelled at load time.
+    baconTables : OrderedDict of str to BaconTable
+        The least-recently-used whole-graph Bacon number tables, by center actor.
+    landmarks : LandmarkOracle or None
+        Precomputed landmark searches answering queries from distance bounds,
+        once buildLandmarks has been called.
+    treeCache : TreeCache
+        The least-recently-used search trees by source actor, with hit/miss counters.
 
     Methods
     -------
     generateAdjList(fileName)
         Constructs the adjacency list from the given file.
     
-    calcBaconNumber(startActor, endActor)
+    calcBaconNumber(startActor, endActor, bidirectional=False)
         Calculates the Bacon number between two actors.
     
+    calcBaconNumbers(startActor, endActors)
+        Calculates the Bacon numbers from one actor to many, in one traversal.
+
     calcAvgNumber(startActor, threshold)
         Calculates the average Bacon number for a given actor.
+
+    baconTable(centerActor)
+        Returns the Bacon number of every actor from a center actor.
+
+    buildLandmarks(k)
+        Precomputes k landmark searches for instant distance bounds.
+
+    estimateBaconNumber(startActor, endActor)
+        Returns lower and upper bounds on the Bacon number in O(k).
+
+    collaborationRadius(actor, k, minYear, maxYear)
+        Lazily yields the actors within k hops, ranked by shared films.
+
+    add_movie(title, cast)
+        Adds a movie, repairing cached distances in place.
+
+    remove_movie(title)
+        Removes a movie, dropping the cached distances it invalidates.
+
+    checkpoint()
+        Writes the current graph to the index and empties the journal.
     """
 
-    def __init__(self, fileName):
+    def __init__(self, fileName, indexName=None, cacheSize=0, journalName=None, tableCacheSize=8):
         """
         Constructs all the necessary attributes for the BaconNumberCalculator object.
 
@@ -35,11 +89,36 @@ class BaconNumberCalculator:
         ----------
         fileName : str
             The name of the file containing the movie data.
+        indexName : str, optional
+            A binary index file caching the parsed graph (default is None, always parse).
+        cacheSize : int, optional
+            How many source actors' search trees to keep (default is 0, no cache).
+            With a cache, every query searches the whole graph from a new
+            source once, and later queries from it are O(path length).
+        journalName : str, optional
+            A file recording every add_movie/remove_movie. Changes found in
+            it are replayed on top of the loaded graph (default is None).
+        tableCacheSize : int, optional
+            How many Bacon tables from baconTable to keep (default is 8). Every
+            table holds one int array over the actors, about 0.5 MB on
+            PopularCast.txt, and is repaired on every add_movie.
         """
+        self.fileName = fileName
+        self.indexName = indexName
+        self.journalName = journalName
+        self.graph = None
+        self.components = None
         self.adjList = {}
-        self.generateAdjList(fileName)
-
-    def generateAdjList(self, fileName):
+        self.baconTables = OrderedDict()
+        self.tableCacheSize = tableCacheSize
+        self.landmarks = None
+        self.cacheSize = cacheSize
+        self.treeCache = None
+        self.generateAdjList(fileName, indexName)
+        if journalName and os.path.exists(journalName):
+            self.replayJournal()
+
+    def generateAdjList(self, fileName, indexName=None):
         """
         Reads a file and builds an adjacency list representing actor connections.
 
@@ -49,10 +128,20 @@ class BaconNumberCalculator:
             The name of the file to read the movie data from.
             You need to think about which encoding you should use,
 	        To load the file.
+        indexName : str, optional
+            If given, the graph is mapped from this index file when it is
+            current, and the index is (re)written after parsing when the
+            file is missing, from an older version, or fileName changed.
         
         Attributes
         ----------
-        adjList : dict of dict/dict of list/ dict of tuple/etc...
+        graph : CastGraph
+        Actors and movies are interned to integer IDs and the actor-movie
+        incidence is stored as CSR arrays in both directions, see cast_graph.py.
+        adjList : AdjacencyView
+        A read-only dict-like view over graph, kept for the old API.
+        components : ComponentIndex
+        The connected components, labelled once here and saved in the index.
         The key of the adjList should be the original(unmodified) actor name
         in the inputted file. You should not and do not need to modify it.
         For example:
@@ -64,15 +153,17 @@ class BaconNumberCalculator:
         -------
         None
         """
-        with open(fileName, 'r', encoding='ISO-8859-1') as f:
-            for line in f:
-                actors = line.strip().split('/')[1:]
-                for i in range(len(actors)):
-                    if actors[i] not in self.adjList:
-                        self.adjList[actors[i]] = set()
-                    self.adjList[actors[i]].update(actors[j] for j in range(len(actors)) if j != i)
-
-    def calcBaconNumber(self, startActor, endActor):
+        self.graph = load_index(indexName, fileName) if indexName else None
+        if self.graph is None:
+            self.graph = CastGraph.fromFile(fileName, encoding='ISO-8859-1')
+            self.graph.components = ComponentIndex(self.graph)
+            if indexName:
+                save_index(self.graph, indexName, fileName)
+        self.components = self.graph.components
+        self.adjList = self.graph.adjacencyView()
+        self.treeCache = TreeCache(self.graph, self.cacheSize)
+
+    def calcBaconNumber(self, startActor, endActor, bidirectional=False):
         """
         Calculates the Bacon number (shortest path) between two actors.
 
@@ -82,6 +173,10 @@ class BaconNumberCalculator:
             The name of the starting actor.
         endActor : str
             The name of the ending actor.
+        bidirectional : bool, optional
+            Search from both actors at once and stop where the searches meet
+            (default is False). Much faster for distant pairs; the Bacon
+            number is the same, but another shortest path may be returned.
 
         Returns
         -------
@@ -132,31 +227,62 @@ class BaconNumberCalculator:
         if startActor == endActor:
             return [0, [startActor]]
 
-        visited = {startActor}
-        queue = deque([(startActor, [startActor])])
-        while queue:
-            actor, path = queue.popleft()
-            for neighbor in self.adjList[actor]:
-                if neighbor == endActor:
-                    shortestPath = path + [endActor]
-                    baconNumber = len(shortestPath) - 1
-                    while len(shortestPath) < 2 * baconNumber + 1:
-                        for i in range(1, len(shortestPath), 2):
-                            if len(shortestPath) < 2 * baconNumber + 1:
-                                for j in self.adjList[shortestPath[i - 1]]:
-                                    if j != shortestPath[i] and j not in shortestPath:
-                                        shortestPath.insert(i, j)
-                                        break
-                            else:
-                                break
-                    return [baconNumber, shortestPath]
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
+        startId = self.graph.actorId(startActor)
+        endId = self.graph.actorId(endActor)
+        if not self.components.connected(startId, endId):
+            return [-1, []]
+        if self.landmarks is not None:
+            # Tight landmark bounds give the answer without any search.
+            lower, upper, landmark = self.landmarks.bounds(startId, endId)
+            if upper == -1:
+                return [-1, []]
+            if lower == upper:
+                return [upper, self.landmarks.path(startId, endId, landmark)]
+        if self.treeCache.maxSize > 0:
+            # The graph is undirected, so a tree cached for either end will do.
+            tree = self.treeCache.cached(endId)
+            if tree is not None:
+                path = tree.path(startId)[::-1]
+                return [len(path) // 2, path] if path else [-1, []]
+            if bidirectional and startId not in self.treeCache:
+                path = self.graph.bidirectionalPath(startId, endId)
+            else:
+                path = self.treeCache.get(startId).path(endId)
+        elif bidirectional:
+            path = self.graph.bidirectionalPath(startId, endId)
+        else:
+            path = self.graph.bfs(startId, endId).path(endId)
+        if path:
+            return [len(path) // 2, path]
 
         return [-1, []]  # No path found
 
 
+    def calcBaconNumbers(self, startActor, endActors):
+        """
+        Calculates the Bacon numbers from one actor to many actors with a single traversal.
+
+        Parameters
+        ----------
+        startActor : str
+            The name of the starting actor.
+        endActors : list of str
+            The names of the ending actors.
+
+        Returns
+        -------
+        List[List[int, List[str]]]
+            One [Bacon number, path] per ending actor, as calcBaconNumber returns.
+        """
+        if startActor not in self.adjList:
+            return [[-1, []] for _ in endActors]
+        tree = self.treeCache.get(self.graph.actorId(startActor))
+        results = []
+        for endActor in endActors:
+            path = tree.path(self.graph.actorId(endActor)) if endActor in self.adjList else []
+            results.append([len(path) // 2, path] if path else [-1, []])
+        return results
+
     def calcAvgNumber(self, startActor, threshold):
         """
         Calculates the average Bacon number for a given actor until convergence.
@@ -195,26 +321,216 @@ class BaconNumberCalculator:
         if startActor not in self.adjList:
             return -1
 
-        visited = set()
-        queue = deque([(startActor, 0)])
-        totalBNum = 0
-        count = 0
+        # A table used only for its average is not kept, so averaging every actor does not keep every table
+        table = self.baconTables.get(startActor)
+        if table is None:
+            table = BaconTable(self.graph, self.graph.actorId(startActor))
+        return table.average()
 
-        while queue:
-            actor, distance = queue.popleft()
-            if actor not in visited:
-                visited.add(actor)
-                totalBNum += distance
-                count += 1
+    def baconTable(self, centerActor):
+        """
+        Returns the Bacon number of every actor from a center actor.
 
-                for neighbor in self.adjList[actor]:
-                    if neighbor not in visited:
-                        queue.append((neighbor, distance + 1))
+        The table is computed with one BFS on first use and kept, so later
+        lookups, histograms, averages and percentiles are O(1). Only the
+        tableCacheSize most recently used tables are kept.
 
-        if count > 0:
-            return totalBNum / count
-        else:
-            return -1
+        Parameters
+        ----------
+        centerActor : str
+            The name of the center actor, e.g. "Bacon, Kevin".
+
+        Returns
+        -------
+        BaconTable or None
+            None if the actor is not in our graph.
+        """
+        if centerActor not in self.adjList:
+            return None
+        table = self.baconTables.get(centerActor)
+        if table is not None:
+            self.baconTables.move_to_end(centerActor)
+            return table
+        table = BaconTable(self.graph, self.graph.actorId(centerActor))
+        if self.tableCacheSize > 0:
+            self.baconTables[centerActor] = table
+            if len(self.baconTables) > self.tableCacheSize:
+                self.baconTables.popitem(last=False)
+        return table
+
+    def buildLandmarks(self, k=16):
+        """
+        Precomputes one BFS from each of k high-degree landmark actors.
+
+        Afterwards calcBaconNumber first checks the landmark bounds, and only
+        searches when they differ.
+
+        Parameters
+        ----------
+        k : int, optional
+            The number of landmarks (default is 16).
+
+        Returns
+        -------
+        LandmarkOracle
+        """
+        self.landmarks = LandmarkOracle(self.graph, k)
+        return self.landmarks
+
+    def estimateBaconNumber(self, startActor, endActor):
+        """
+        Bounds the Bacon number between two actors in O(k) with the landmarks.
+
+        Parameters
+        ----------
+        startActor : str
+            The name of the starting actor.
+        endActor : str
+            The name of the ending actor.
+
+        Returns
+        -------
+        List[int, int]
+            The lower and upper bound; [-1, -1] if the actors are known to be
+            unconnected or one of them is not in our graph.
+        """
+        if startActor not in self.adjList or endActor not in self.adjList:
+            return [-1, -1]
+        if self.landmarks is None:
+            self.buildLandmarks()
+        lower, upper, _ = self.landmarks.bounds(self.graph.actorId(startActor), self.graph.actorId(endActor))
+        return [lower, upper]
+
+    def collaborationRadius(self, actor, k=2, minYear=None, maxYear=None):
+        """
+        Lazily yields every actor within k hops of an actor.
+
+        Nearer actors come first; within the same number of hops, actors
+        sharing more films with the previous ring come first (for one hop,
+        the films shared with the actor).
+
+        Parameters
+        ----------
+        actor : str
+            The name of the actor.
+        k : int, optional
+            The largest number of hops (default is 2).
+        minYear, maxYear : int, optional
+            Only count movies released in this year range (default is None, all movies).
+
+        Yields
+        ------
+        tuple of (str, int, int)
+            (actor name, hops, number of shared films).
+        """
+        if actor not in self.adjList:
+            return
+        for actorId, hops, shared in kHop(self.graph, self.graph.actorId(actor), k, minYear, maxYear):
+            yield self.graph.names[actorId], hops, shared
+
+    def add_movie(self, title, cast):
+        """
+        Adds a movie to the graph, or more cast to an existing one.
+
+        Cached Bacon tables, search trees and landmarks are repaired in place:
+        new credits can only shorten paths, so only the actors that get
+        closer are visited.
+
+        Parameters
+        ----------
+        title : str
+            The movie title, e.g. "Footloose (1984)".
+        cast : list of str
+            The actor names, in the same form as the cast file.
+
+        Returns
+        -------
+        None
+        """
+        movieId = self.graph.addMovie(title, cast)
+        self.components.movieAdded(movieId)
+        for table in self.baconTables.values():
+            table.movieAdded(movieId)
+        for tree in self.treeCache.trees.values():
+            tree.movieAdded(movieId)
+        if self.landmarks is not None:
+            self.landmarks.movieAdded(movieId)
+        self.writeJournal({'op': 'add', 'title': title, 'cast': list(cast)})
+
+    def remove_movie(self, title):
+        """
+        Removes a movie and all its credits from the graph.
+
+        Only cached Bacon tables, search trees and landmarks that had a
+        shortest path through the movie are dropped or searched again.
+
+        Parameters
+        ----------
+        title : str
+            The movie title.
+
+        Returns
+        -------
+        bool
+            False if there is no such movie.
+        """
+        movieId = self.graph.titleIds.get(title)
+        if movieId is None:
+            return False
+        staleTables = [actor for actor, table in self.baconTables.items() if table.removalAffects(movieId)]
+        staleTrees = [source for source, tree in self.treeCache.trees.items() if tree.usesMovie(movieId)]
+        staleLandmarks = self.landmarks.treesUsing(movieId) if self.landmarks is not None else []
+        self.graph.removeMovie(title)
+        self.components.movieRemoved()
+        for actor in staleTables:
+            del self.baconTables[actor]
+        for source in staleTrees:
+            del self.treeCache.trees[source]
+        if staleLandmarks:
+            self.landmarks.searchAgain(staleLandmarks)
+        self.writeJournal({'op': 'remove', 'title': title})
+        return True
+
+    def writeJournal(self, entry):
+        """
+        Appends one change to the journal file, if there is one.
+        """
+        if self.journalName:
+            with open(self.journalName, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def replayJournal(self):
+        """
+        Applies the changes recorded in the journal file to the graph.
+        """
+        journalName, self.journalName = self.journalName, None
+        try:
+            with open(journalName, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry['op'] == 'add':
+                        self.add_movie(entry['title'], entry['cast'])
+                    else:
+                        self.remove_movie(entry['title'])
+        finally:
+            self.journalName = journalName
+
+    def checkpoint(self):
+        """
+        Writes the current graph to the index file and empties the journal.
+
+        If the cast file itself changes later, the index is rebuilt from it
+        and checkpointed changes are lost, so apply them to the file too.
+        """
+        if not self.indexName:
+            raise ValueError("checkpoint needs an indexName")
+        save_index(self.graph, self.indexName, self.fileName)
+        if self.journalName:
+            open(self.journalName, 'w').close()
 
 if __name__ == "__main__":
     calculator = BaconNumberCalculator("PopularCast.txt")
@@ -0,0 +1,157 @@
+import numpy as np
+from cast_graph import growArray, relaxMovie
+
+
+class BaconTable:
+    """
+    The Bacon number of every actor from one center actor, computed in a single BFS.
+
+    The distances are kept in one int array indexed by actor ID, together with
+    their histogram and its running totals, so every query after construction
+    is O(1).
+
+    Attributes
+    ----------
+    graph : CastGraph
+        The graph the table was computed on.
+    center : int
+        The ID of the center actor.
+    distance : numpy.ndarray of int32
+        The Bacon number of every actor, or -1 if unreachable from the center.
+    counts : numpy.ndarray of int64
+        ``counts[d]`` is the number of actors with Bacon number ``d``.
+    """
+
+    def __init__(self, graph, center, distance=None):
+        """
+        Parameters
+        ----------
+        graph : CastGraph
+            The graph to search.
+        center : int
+            The ID of the center actor.
+        distance : numpy.ndarray, optional
+            Precomputed distances, e.g. loaded from disk (default is None, run a BFS).
+        """
+        self.graph = graph
+        self.center = center
+        if distance is None:
+            distance = graph.bfs(center).distance
+        self.distance = distance
+        self._count()
+
+    def _count(self):
+        distance = self.distance
+        self.counts = np.bincount(distance[distance >= 0])
+        self.cumulative = np.cumsum(self.counts)
+        self.total = int(np.dot(self.counts, np.arange(len(self.counts))))
+
+    def movieAdded(self, movieId):
+        """
+        Repairs the table after ``CastGraph.addMovie`` by lowering only the distances that change.
+        """
+        self.distance = growArray(self.distance, self.graph.numActors())
+        if relaxMovie(self.graph, self.distance, movieId):
+            self._count()
+
+    def removalAffects(self, movieId):
+        """
+        Returns whether removing a movie may lengthen some Bacon number in this table.
+
+        Co-stars are at most one apart, so the movie lies on a shortest path
+        from the center only if its cast is not all at the same distance.
+        Call it before ``CastGraph.removeMovie``.
+        """
+        distance = self.distance[self.graph.castOf(movieId)]
+        return bool(len(distance)) and distance.min() != distance.max()
+
+    def number(self, actor):
+        """
+        Returns the Bacon number of an actor.
+
+        Parameters
+        ----------
+        actor : str
+            The actor name.
+
+        Returns
+        -------
+        int
+            The Bacon number, or -1 if the actor is unknown or unreachable.
+        """
+        actorId = self.graph.actorId(actor)
+        if actorId == -1:
+            return -1
+        return int(self.distance[actorId])
+
+    def reachable(self):
+        """
+        Returns the number of actors reachable from the center, the center included.
+        """
+        return int(self.cumulative[-1])
+
+    def histogram(self):
+        """
+        Returns a dict mapping every Bacon number to its number of actors.
+        """
+        return {d: int(c) for d, c in enumerate(self.counts) if c}
+
+    def average(self):
+        """
+        Returns the average Bacon number over every reachable actor, the center included.
+        """
+        return self.total / self.reachable()
+
+    def percentile(self, q):
+        """
+        Returns the smallest Bacon number that at least ``q`` percent of reachable actors have.
+
+        Parameters
+        ----------
+        q : float
+            The percentile, between 0 and 100.
+
+        Returns
+        -------
+        int
+        """
+        rank = q / 100 * self.reachable()
+        return int(np.searchsorted(self.cumulative, rank))
+
+    def eccentricity(self):
+        """
+        Returns the largest Bacon number of any reachable actor.
+        """
+        return len(self.counts) - 1
+
+    def save(self, fileName):
+        """
+        Saves the distance array in ``.npy`` format to exactly ``fileName``, for ``load``.
+
+        The center is the only actor at distance 0, so it is not stored separately.
+        """
+        # np.save would append .npy to a name without it, and load would not find the file
+        with open(fileName, 'wb') as f:
+            np.save(f, self.distance)
+
+    @classmethod
+    def load(cls, graph, fileName):
+        """
+        Loads a table saved by ``save`` for the same graph.
+
+        Parameters
+        ----------
+        graph : CastGraph
+            The graph the table was computed on.
+        fileName : str
+            The ``.npy`` file to read.
+
+        Returns
+        -------
+        BaconTable
+        """
+        distance = np.load(fileName)
+        if len(distance) != graph.numActors():
+            raise ValueError(f"{fileName} has {len(distance)} actors, the graph has {graph.numActors()}")
+        center = int(np.flatnonzero(distance == 0)[0])
+        return cls(graph, center, distance)
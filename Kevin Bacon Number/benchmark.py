@@ -0,0 +1,183 @@
+"""
+Benchmarks the Bacon number calculators on the bundled datasets.
+
+Every (backend, dataset) pair runs in its own subprocess so its peak RSS is
+measured in isolation, and a backend that hangs only loses its own run.
+
+    python benchmark.py                      # everything, to benchmark.json
+    python benchmark.py -b bacon_number -d mimi_graph.txt -o quick.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DATASETS = ['mimi_graph.txt', 'Bacon_06.txt', 'PopularCast.txt']
+
+# label: (module, constructor keyword arguments, calcBaconNumber keyword arguments)
+BACKENDS = {
+    'bacon_number1': ('bacon_number1', {}, {}),
+    'bacon_number': ('bacon_number', {}, {}),
+    'bacon_number-bidirectional': ('bacon_number', {}, {'bidirectional': True}),
+    'bacon_number-cache': ('bacon_number', {'cacheSize': 64}, {}),
+}
+
+
+def peakRss():
+    """
+    Returns the peak resident set size of this process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def timings(seconds):
+    seconds = sorted(seconds)
+    if not seconds:
+        return {'count': 0}
+    return {
+        'count': len(seconds),
+        'total': sum(seconds),
+        'mean': sum(seconds) / len(seconds),
+        'p50': seconds[len(seconds) // 2],
+        'p95': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+        'max': seconds[-1],
+    }
+
+
+def runOne(label, dataset, pairs=20, targets=100, averages=3, seed=17):
+    """
+    Benchmarks one backend on one dataset in this process.
+
+    Parameters
+    ----------
+    label : str
+        A key of BACKENDS.
+    dataset : str
+        A file name in the data directory.
+    pairs : int, optional
+        The number of seeded single-pair queries (default is 20).
+    targets : int, optional
+        The number of targets in the batch query (default is 100).
+    averages : int, optional
+        The number of calcAvgNumber calls (default is 3).
+    seed : int, optional
+        The seed for choosing actors (default is 17).
+
+    Returns
+    -------
+    dict
+    """
+    moduleName, options, queryOptions = BACKENDS[label]
+    sys.path.insert(0, HERE)
+    module = importlib.import_module(moduleName)
+    start = time.perf_counter()
+    calculator = module.BaconNumberCalculator(os.path.join(HERE, 'data', dataset), **options)
+    load = time.perf_counter() - start
+
+    actors = sorted(calculator.adjList)
+    rng = random.Random(seed)
+    queries = [(rng.choice(actors), rng.choice(actors)) for _ in range(pairs)]
+    single = []
+    numbers = []
+    for startActor, endActor in queries:
+        start = time.perf_counter()
+        numbers.append(calculator.calcBaconNumber(startActor, endActor, **queryOptions)[0])
+        single.append(time.perf_counter() - start)
+
+    source = queries[0][0]
+    batchTargets = [rng.choice(actors) for _ in range(targets)]
+    start = time.perf_counter()
+    if hasattr(calculator, 'calcBaconNumbers'):
+        calculator.calcBaconNumbers(source, batchTargets)
+    else:
+        for endActor in batchTargets:
+            calculator.calcBaconNumber(source, endActor)
+    batch = time.perf_counter() - start
+
+    centers = [actor for actor in ['Bacon, Kevin'] if actor in calculator.adjList]
+    centers += [rng.choice(actors) for _ in range(averages - len(centers))]
+    average = []
+    for center in centers:
+        start = time.perf_counter()
+        calculator.calcAvgNumber(center, 0.1)
+        average.append(time.perf_counter() - start)
+
+    return {
+        'backend': label,
+        'dataset': dataset,
+        'actors': len(actors),
+        'loadSeconds': load,
+        'single': timings(single),
+        'numbers': numbers,
+        'batch': {'targets': targets, 'seconds': batch},
+        'average': timings(average),
+        'peakRssMB': peakRss(),
+    }
+
+
+def runAll(backends, datasets, timeout=600, **options):
+    """
+    Runs every backend on every dataset, each in a fresh subprocess.
+
+    A run that crashes or exceeds ``timeout`` seconds is recorded with an
+    ``error`` entry instead of results.
+    """
+    runs = []
+    for dataset in datasets:
+        for label in backends:
+            command = [sys.executable, os.path.abspath(__file__), '--worker', label, dataset,
+                       '--options', json.dumps(options)]
+            try:
+                done = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+                if done.returncode == 0:
+                    runs.append(json.loads(done.stdout.splitlines()[-1]))
+                else:
+                    runs.append({'backend': label, 'dataset': dataset,
+                                 'error': done.stderr.strip().splitlines()[-1:]})
+            except subprocess.TimeoutExpired:
+                runs.append({'backend': label, 'dataset': dataset, 'error': f'timeout after {timeout}s'})
+            print(label, dataset, 'error' in runs[-1] and runs[-1]['error'] or 'ok', file=sys.stderr)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--backend', action='append', choices=list(BACKENDS))
+    parser.add_argument('-d', '--dataset', action='append', choices=DATASETS)
+    parser.add_argument('-o', '--output', default='benchmark.json')
+    parser.add_argument('--pairs', type=int, default=20)
+    parser.add_argument('--targets', type=int, default=100)
+    parser.add_argument('--averages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=17)
+    parser.add_argument('--timeout', type=int, default=600)
+    parser.add_argument('--worker', nargs=2, metavar=('BACKEND', 'DATASET'), help=argparse.SUPPRESS)
+    parser.add_argument('--options', default='{}', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(runOne(*args.worker, **json.loads(args.options))))
+        return
+
+    options = {'pairs': args.pairs, 'targets': args.targets, 'averages': args.averages, 'seed': args.seed}
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': options,
+        'runs': runAll(args.backend or list(BACKENDS), args.dataset or DATASETS, args.timeout, **options),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
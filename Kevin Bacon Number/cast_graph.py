@@ -0,0 +1,652 @@
+from array import array
+from collections.abc import Mapping
+import os
+import re
+import sys
+import numpy as np
+
+
+# The release year in a title such as "Footloose (1984)" or "Crash (2004/I)"; the cast
+# files use "/" between fields, so they write the latter as "Crash (2004 I)".
+YEAR_PATTERN = re.compile(r'\((\d{4})(?:[/ ][IVXL]+)?\)')
+
+
+def sortedUnique(values):
+    """
+    Returns the sorted unique values of an int array.
+
+    Sorting and dropping repeats is much faster than ``numpy.unique`` on the
+    large, heavily duplicated pair arrays built here.
+    """
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+class CastGraph:
+    """
+    A compact bipartite actor-movie graph stored in CSR (compressed sparse row) form.
+
+    Actor names and movie titles are interned to consecutive integer IDs.
+    The movies of actor ``i`` are ``actorMovies[actorOffsets[i]:actorOffsets[i + 1]]``
+    and the cast of movie ``m`` is ``movieActors[movieOffsets[m]:movieOffsets[m + 1]]``.
+    Searches only touch these contiguous int arrays, never the name strings,
+    and no co-star clique is ever materialized.
+
+    Attributes
+    ----------
+    names : list of str
+        The actor name for every actor ID.
+    ids : dict of str to int
+        The actor ID for every actor name.
+    titles : list of str
+        The movie title for every movie ID.
+    titleIds : dict of str to int
+        The movie ID for every movie title.
+    actorOffsets : numpy.ndarray of int64
+        Row offsets into ``actorMovies``, of length ``len(names) + 1``.
+    actorMovies : numpy.ndarray of int32
+        The concatenated, sorted movie lists of every actor.
+    movieOffsets : numpy.ndarray of int64
+        Row offsets into ``movieActors``, of length ``len(titles) + 1``.
+    movieActors : numpy.ndarray of int32
+        The concatenated, sorted cast lists of every movie.
+    """
+
+    # Bytes read from the cast file at a time.
+    BLOCK_SIZE = 1 << 22
+    # Rough peak bytes per (movie, actor) credit while fromIncidence builds the CSR arrays.
+    BUILD_BYTES_PER_CREDIT = 48
+    # Rough bytes per actor name or movie title besides the string itself: its
+    # list and dict slots, with the ID dicts built again by the constructor.
+    BUILD_BYTES_PER_NAME = 130
+
+    def __init__(self, names, titles, actorOffsets, actorMovies, movieOffsets, movieActors):
+        """
+        Parameters
+        ----------
+        names : list of str
+            The actor name for every actor ID.
+        titles : list of str
+            The movie title for every movie ID.
+        actorOffsets, actorMovies : numpy.ndarray
+            The actor to movie CSR arrays.
+        movieOffsets, movieActors : numpy.ndarray
+            The movie to actor CSR arrays.
+        """
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.titles = titles
+        self.titleIds = {title: i for i, title in enumerate(titles)}
+        self.actorOffsets = actorOffsets
+        self.actorMovies = actorMovies
+        self.movieOffsets = movieOffsets
+        self.movieActors = movieActors
+        self._years = None
+        # A ComponentIndex, set by whoever labels the components.
+        self.components = None
+
+    @classmethod
+    def fromFile(cls, fileName, encoding='ISO-8859-1', progress=None, maxMemory=None):
+        """
+        Builds the graph from a cast file with one ``movie/actor/actor/...`` line per movie.
+
+        The file is streamed in fixed-size blocks and only the (movie, actor)
+        incidence is kept, as compact int32 arrays, so memory grows with the
+        number of credits rather than with the square of the cast sizes.
+
+        Parameters
+        ----------
+        fileName : str
+            The name of the file to read the movie data from.
+        encoding : str, optional
+            The file encoding (default is ISO-8859-1).
+        progress : callable, optional
+            Called as ``progress(bytesRead, totalBytes)`` after every block.
+        maxMemory : int, optional
+            A budget in bytes for the loader. Blocks are kept well below it,
+            and a MemoryError is raised as soon as the interned names and
+            titles, the incidence arrays and the CSR build are projected to
+            exceed it (default is None, no limit).
+
+        Returns
+        -------
+        CastGraph
+        """
+        blockSize = cls.BLOCK_SIZE if maxMemory is None else max(1 << 12, min(cls.BLOCK_SIZE, maxMemory // 16))
+        totalBytes = os.path.getsize(fileName)
+        bytesRead = 0
+        ids = {}
+        names = []
+        titleIds = {}
+        titles = []
+        # The sizes of the interned name and title strings so far, which usually outweigh the int arrays.
+        stringBytes = 0
+        movieOf = array('i')
+        actorOf = array('i')
+        rest = b''
+        with open(fileName, 'rb') as f:
+            while True:
+                block = f.read(blockSize)
+                bytesRead += len(block)
+                lines = (rest + block).split(b'\n')
+                # The last piece may be a partial line; keep it for the next block.
+                rest = lines.pop() if block else b''
+                for line in lines:
+                    fields = line.decode(encoding).strip().split('/')
+                    if not fields[0]:
+                        continue
+                    movieId = titleIds.get(fields[0])
+                    if movieId is None:
+                        movieId = titleIds[fields[0]] = len(titles)
+                        titles.append(fields[0])
+                        stringBytes += sys.getsizeof(fields[0])
+                    cast = []
+                    for actor in fields[1:]:
+                        actorId = ids.get(actor)
+                        if actorId is None:
+                            actorId = ids[actor] = len(names)
+                            names.append(actor)
+                            stringBytes += sys.getsizeof(actor)
+                        cast.append(actorId)
+                    movieOf.extend([movieId] * len(cast))
+                    actorOf.extend(cast)
+                if maxMemory is not None:
+                    projected = (len(movieOf) * cls.BUILD_BYTES_PER_CREDIT + stringBytes
+                                 + (len(names) + len(titles)) * cls.BUILD_BYTES_PER_NAME)
+                    if projected > maxMemory:
+                        raise MemoryError(f"{fileName}: {len(movieOf)} credits and {len(names) + len(titles)} "
+                                          f"names after {bytesRead} of {totalBytes} bytes need about "
+                                          f"{projected} bytes, more than maxMemory={maxMemory}")
+                if progress is not None:
+                    progress(bytesRead, totalBytes)
+                if not block:
+                    break
+        # The constructor builds its own ID dicts; free these first.
+        del ids, titleIds
+        return cls.fromIncidence(names, titles, np.frombuffer(movieOf, dtype=np.int32),
+                                 np.frombuffer(actorOf, dtype=np.int32))
+
+    @classmethod
+    def fromIncidence(cls, names, titles, movieOf, actorOf):
+        """
+        Builds both CSR directions from parallel (movie ID, actor ID) incidence lists.
+
+        Parameters
+        ----------
+        names : list of str
+            The actor name for every actor ID.
+        titles : list of str
+            The movie title for every movie ID.
+        movieOf, actorOf : sequence of int
+            One (movie, actor) credit per position; repeats are dropped.
+
+        Returns
+        -------
+        CastGraph
+        """
+        width = max(len(names), 1)
+        codes = sortedUnique(np.asarray(movieOf, dtype=np.int64) * width
+                             + np.asarray(actorOf, dtype=np.int64))
+        movies = (codes // width).astype(np.int32)
+        actors = (codes % width).astype(np.int32)
+        del codes
+        movieOffsets = csrOffsets(movies, len(titles))
+        # A stable sort by actor keeps every actor's movie list sorted too.
+        order = np.argsort(actors, kind='stable')
+        actorOffsets = csrOffsets(actors, len(names))
+        actorMovies = movies[order]
+        return cls(names, titles, actorOffsets, actorMovies, movieOffsets, actors)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def numActors(self):
+        """
+        Returns the number of actors, from the CSR arrays so it also works without names.
+        """
+        return len(self.actorOffsets) - 1
+
+    def numMovies(self):
+        return len(self.movieOffsets) - 1
+
+    def movieYears(self):
+        """
+        Returns the release year of every movie parsed from its title, or -1 if it has none.
+
+        The array is computed on first use and again only after movies were added.
+        """
+        if self._years is None or len(self._years) != len(self.titles):
+            years = np.full(len(self.titles), -1, dtype=np.int16)
+            for movieId, title in enumerate(self.titles):
+                found = YEAR_PATTERN.findall(title)
+                if found:
+                    years[movieId] = int(found[-1])
+            self._years = years
+        return self._years
+
+    def actorId(self, name):
+        """
+        Returns the ID of an actor, or -1 if the actor is not in the graph.
+        """
+        return self.ids.get(name, -1)
+
+    def moviesOf(self, actorId):
+        """
+        Returns the movie IDs of an actor as an array slice.
+        """
+        return self.actorMovies[self.actorOffsets[actorId]:self.actorOffsets[actorId + 1]]
+
+    def castOf(self, movieId):
+        """
+        Returns the actor IDs of a movie as an array slice.
+        """
+        return self.movieActors[self.movieOffsets[movieId]:self.movieOffsets[movieId + 1]]
+
+    def neighborIds(self, actorId):
+        """
+        Returns the sorted co-star IDs of an actor, excluding the actor.
+        """
+        _, costars = gather(self.movieOffsets, self.movieActors, self.moviesOf(actorId))
+        costars = sortedUnique(costars)
+        return costars[costars != actorId]
+
+    def bfs(self, source, target=-1):
+        """
+        Runs a level-synchronous breadth-first search from one actor.
+
+        Parameters
+        ----------
+        source : int
+            The ID of the start actor.
+        target : int, optional
+            Stop as soon as this actor is reached (default is -1, search everything).
+
+        Returns
+        -------
+        SearchTree
+        """
+        tree = SearchTree(self, source)
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while len(frontier):
+            if target >= 0 and tree.distance[target] != -1:
+                break
+            level += 1
+            frontier = self._step(tree, frontier, level)
+        return tree
+
+    def bidirectionalPath(self, source, target):
+        """
+        Finds a shortest path by growing searches from both actors until they meet.
+
+        Each round expands the side with the smaller frontier by one full
+        level, so the search stays around the cheaper end instead of
+        covering most of the graph from ``source``.
+
+        Parameters
+        ----------
+        source : int
+            The ID of the start actor.
+        target : int
+            The ID of the end actor.
+
+        Returns
+        -------
+        list of str
+            ``[source, movie1, actor1, ..., target]``, or an empty list if the
+            actors are not connected.
+        """
+        trees = [SearchTree(self, source), SearchTree(self, target)]
+        frontiers = [np.array([source], dtype=np.int64), np.array([target], dtype=np.int64)]
+        levels = [0, 0]
+        if source == target:
+            return trees[0].path(target)
+        while len(frontiers[0]) and len(frontiers[1]):
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            levels[side] += 1
+            frontiers[side] = self._step(trees[side], frontiers[side], levels[side])
+            other = trees[1 - side]
+            met = frontiers[side][other.distance[frontiers[side]] != -1]
+            if len(met):
+                # Every actor met in this level is on a path of the same
+                # level + other distance, so take the shortest among them.
+                actor = met[np.argmin(other.distance[met])]
+                forward = trees[0].path(actor)
+                backward = trees[1].path(actor)
+                return forward + backward[-2::-1]
+        return []
+
+    def _step(self, tree, frontier, level):
+        """
+        Expands a search by one level: frontier actors to their movies, and
+        those movies to their not yet seen cast members, in two vectorized steps.
+
+        Returns
+        -------
+        numpy.ndarray
+            The actors first reached at ``level``.
+        """
+        actors, movies = gather(self.actorOffsets, self.actorMovies, frontier)
+        movies, actors = claim(tree.movieParent, movies, actors)
+        movies, frontier = gather(self.movieOffsets, self.movieActors, movies)
+        fresh = tree.distance[frontier] == -1
+        frontier, _ = claim(tree.parent, frontier[fresh], movies[fresh])
+        tree.distance[frontier] = level
+        return frontier
+
+    def addMovie(self, title, cast):
+        """
+        Adds a movie, or more cast to an existing movie, updating both CSR directions.
+
+        New actors get the next free IDs and existing IDs never change, so
+        distance arrays computed earlier only need to grow. Each call shifts
+        the CSR arrays once (a memory copy), with no re-sorting.
+
+        Parameters
+        ----------
+        title : str
+            The movie title.
+        cast : list of str
+            The actor names.
+
+        Returns
+        -------
+        int
+            The movie ID.
+        """
+        movieId = self.titleIds.get(title)
+        if movieId is None:
+            movieId = self.titleIds[title] = len(self.titles)
+            self.titles.append(title)
+            self.movieOffsets = np.append(self.movieOffsets, self.movieOffsets[-1])
+        actorIds = []
+        for actor in cast:
+            actorId = self.ids.get(actor)
+            if actorId is None:
+                actorId = self.ids[actor] = len(self.names)
+                self.names.append(actor)
+                self.actorOffsets = np.append(self.actorOffsets, self.actorOffsets[-1])
+            actorIds.append(actorId)
+        current = self.castOf(movieId)
+        added = np.setdiff1d(np.array(actorIds, dtype=np.int32), current)
+        if len(added) == 0:
+            return movieId
+
+        start, end = self.movieOffsets[movieId], self.movieOffsets[movieId + 1]
+        merged = np.union1d(current, added).astype(np.int32)
+        self.movieActors = np.concatenate([self.movieActors[:start], merged, self.movieActors[end:]])
+        self.movieOffsets = self.movieOffsets + np.where(np.arange(len(self.movieOffsets)) > movieId, len(added), 0)
+
+        positions = [self.actorOffsets[a] + np.searchsorted(self.moviesOf(a), movieId) for a in added]
+        self.actorMovies = np.insert(self.actorMovies, positions, movieId).astype(np.int32)
+        bump = np.zeros(len(self.actorOffsets), dtype=np.int64)
+        bump[added + 1] = 1
+        self.actorOffsets = self.actorOffsets + np.cumsum(bump)
+        return movieId
+
+    def removeMovie(self, title):
+        """
+        Removes a movie and all its credits.
+
+        The movie ID is kept as an empty row, so no other ID changes.
+
+        Parameters
+        ----------
+        title : str
+            The movie title.
+
+        Returns
+        -------
+        int
+            The removed movie ID, or -1 if there is no such movie.
+        """
+        movieId = self.titleIds.pop(title, -1)
+        if movieId == -1:
+            return -1
+        cast = self.castOf(movieId).copy()
+        start, end = self.movieOffsets[movieId], self.movieOffsets[movieId + 1]
+        self.movieActors = np.concatenate([self.movieActors[:start], self.movieActors[end:]])
+        self.movieOffsets = self.movieOffsets - np.where(np.arange(len(self.movieOffsets)) > movieId, len(cast), 0)
+
+        positions = [self.actorOffsets[a] + np.searchsorted(self.moviesOf(a), movieId) for a in cast]
+        self.actorMovies = np.delete(self.actorMovies, positions)
+        bump = np.zeros(len(self.actorOffsets), dtype=np.int64)
+        bump[cast + 1] = 1
+        self.actorOffsets = self.actorOffsets - np.cumsum(bump)
+        return movieId
+
+    def adjacencyView(self):
+        return AdjacencyView(self)
+
+
+class SearchTree:
+    """
+    The result of a breadth-first search over a ``CastGraph``.
+
+    Attributes
+    ----------
+    graph : CastGraph
+        The searched graph.
+    source : int
+        The ID of the start actor.
+    distance : numpy.ndarray of int32
+        The Bacon number of every actor from ``source``, or -1 if unreached.
+    parent : numpy.ndarray of int32
+        The movie through which every reached actor was found, or -1.
+    movieParent : numpy.ndarray of int32
+        The actor through which every reached movie was found, or -1.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        self.distance = np.full(graph.numActors(), -1, dtype=np.int32)
+        self.parent = np.full(graph.numActors(), -1, dtype=np.int32)
+        self.movieParent = np.full(graph.numMovies(), -1, dtype=np.int32)
+        self.distance[source] = 0
+
+    def path(self, target):
+        """
+        Rebuilds the path to an actor in O(path length).
+
+        Parameters
+        ----------
+        target : int
+            The ID of a reached actor.
+
+        Returns
+        -------
+        list of str
+            ``[source, movie1, actor1, movie2, ..., target]`` as names and titles,
+            or an empty list if ``target`` was not reached.
+        """
+        if self.distance[target] == -1:
+            return []
+        path = [self.graph.names[target]]
+        actor = target
+        while actor != self.source:
+            movie = self.parent[actor]
+            actor = self.movieParent[movie]
+            path.append(self.graph.titles[movie])
+            path.append(self.graph.names[actor])
+        path.reverse()
+        return path
+
+    def grow(self):
+        """
+        Extends the arrays with unreached entries for actors and movies added since the search.
+        """
+        self.distance = growArray(self.distance, self.graph.numActors())
+        self.parent = growArray(self.parent, self.graph.numActors())
+        self.movieParent = growArray(self.movieParent, self.graph.numMovies())
+
+    def movieAdded(self, movieId):
+        """
+        Repairs the tree after ``CastGraph.addMovie`` instead of searching again.
+        """
+        self.grow()
+        relaxMovie(self.graph, self.distance, movieId, self.parent, self.movieParent)
+
+    def usesMovie(self, movieId):
+        """
+        Returns whether any path in the tree goes through a movie, i.e. whether removing it invalidates the tree.
+        """
+        return bool((self.parent[self.graph.castOf(movieId)] == movieId).any())
+
+
+def growArray(values, size):
+    """
+    Returns ``values`` padded with -1 up to ``size`` entries.
+    """
+    if len(values) >= size:
+        return values
+    return np.concatenate([values, np.full(size - len(values), -1, dtype=values.dtype)])
+
+
+def relaxMovie(graph, distance, movieId, parent=None, movieParent=None):
+    """
+    Lowers the distances of a finished search after a movie gained cast members.
+
+    New credits can only shorten paths, so only actors that get strictly
+    closer are visited, level by level from the movie, instead of searching
+    the whole graph again.
+
+    Parameters
+    ----------
+    graph : CastGraph
+        The graph, already updated.
+    distance : numpy.ndarray
+        The distances to repair in place, already grown to the graph size.
+    movieId : int
+        The movie that gained credits.
+    parent, movieParent : numpy.ndarray, optional
+        The search tree arrays to repair along with ``distance``.
+
+    Returns
+    -------
+    int
+        The number of actors whose distance went down.
+    """
+    cast = graph.castOf(movieId)
+    reached = cast[distance[cast] >= 0]
+    if len(reached) == 0:
+        return 0
+    best = reached[np.argmin(distance[reached])]
+    level = int(distance[best])
+    if movieParent is not None:
+        current = movieParent[movieId]
+        if current == -1 or distance[current] > level:
+            movieParent[movieId] = best
+    movies = np.array([movieId], dtype=np.int64)
+    improved = 0
+    while len(movies):
+        level += 1
+        rows, actors = gather(graph.movieOffsets, graph.movieActors, movies)
+        closer = (distance[actors] == -1) | (distance[actors] > level)
+        rows, actors = rows[closer], actors[closer]
+        if parent is not None:
+            parent[actors] = rows
+        actors = sortedUnique(actors)
+        if len(actors) == 0:
+            break
+        distance[actors] = level
+        improved += len(actors)
+        actors, movies = gather(graph.actorOffsets, graph.actorMovies, actors)
+        if movieParent is not None:
+            current = movieParent[movies]
+            # A movie whose parent just got closer must be expanded again too.
+            farther = (current == -1) | (distance[np.maximum(current, 0)] >= level)
+            movies, actors = movies[farther], actors[farther]
+            movieParent[movies] = actors
+        movies = sortedUnique(movies)
+    return improved
+
+
+def csrOffsets(rows, size):
+    """
+    Returns CSR row offsets for a sorted array of row IDs.
+    """
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=offsets[1:])
+    return offsets
+
+
+def gather(offsets, values, rows):
+    """
+    Gathers the CSR entries of many rows in one vectorized step.
+
+    Parameters
+    ----------
+    offsets, values : numpy.ndarray
+        The CSR arrays.
+    rows : numpy.ndarray of int
+        The rows to gather.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``(sources, targets)``, the row and value of every gathered entry.
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    # Position of every gathered entry inside values.
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return np.repeat(rows, counts), values[shift + np.arange(total)]
+
+
+def claim(parent, nodes, parents):
+    """
+    Records a parent for every unclaimed node and returns the newly claimed nodes once each.
+
+    ``(node, parent)`` pairs must be distinct. When several pairs reach the
+    same node, one of them wins the parent slot; keeping only the winners
+    de-duplicates ``nodes`` without sorting.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``(nodes, parents)`` of the winning pairs.
+    """
+    fresh = parent[nodes] == -1
+    nodes, parents = nodes[fresh], parents[fresh]
+    parent[nodes] = parents
+    won = parent[nodes] == parents
+    return nodes[won], parents[won]
+
+
+class AdjacencyView(Mapping):
+    """
+    A read-only ``dict``-like view mapping an actor name to the set of co-star names.
+
+    It keeps code written against the old ``adjList`` dictionary working on top
+    of a ``CastGraph``; neighbor sets are only materialized when looked up.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        actorId = self.graph.ids[name]
+        names = self.graph.names
+        return {names[i] for i in self.graph.neighborIds(actorId)}
+
+    def __contains__(self, name):
+        return name in self.graph.ids
+
+    def __iter__(self):
+        return iter(self.graph.names)
+
+    def __len__(self):
+        return len(self.graph.names)
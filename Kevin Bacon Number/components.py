@@ -0,0 +1,142 @@
+import numpy as np
+
+
+def componentLabels(graph):
+    """
+    Labels the connected components of the actors with a vectorized union-find.
+
+    Every round finds each actor's root, takes the smallest root in every
+    movie's cast, and hooks the other roots of that cast onto it, until no
+    cast spans two roots. Roots only ever point to smaller IDs, so the
+    forest stays acyclic, and a handful of rounds suffices.
+
+    Parameters
+    ----------
+    graph : CastGraph
+        The graph.
+
+    Returns
+    -------
+    numpy.ndarray of int32
+        The component of every actor, numbered from 0 by decreasing size.
+    """
+    parent = np.arange(graph.numActors(), dtype=np.int64)
+    lengths = np.diff(graph.movieOffsets)
+    starts = graph.movieOffsets[:-1][lengths > 0]
+    lengths = lengths[lengths > 0]
+    while len(starts):
+        parent = compress(parent)
+        roots = parent[graph.movieActors]
+        smallest = np.repeat(np.minimum.reduceat(roots, starts), lengths)
+        hook = smallest < roots
+        if not hook.any():
+            break
+        np.minimum.at(parent, roots[hook], smallest[hook])
+    _, labels, sizes = np.unique(compress(parent), return_inverse=True, return_counts=True)
+    # Renumber so that component 0 is the largest.
+    rank = np.empty(len(sizes), dtype=np.int32)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes), dtype=np.int32)
+    return rank[labels]
+
+
+def compress(parent):
+    """
+    Points every node of a union-find forest directly at its root.
+    """
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+class ComponentIndex:
+    """
+    The connected components and degree statistics of a cast graph.
+
+    Two actors in different components have no Bacon number, which the
+    index answers in O(1) before any search is started.
+
+    Attributes
+    ----------
+    graph : CastGraph
+        The graph the labels describe.
+    labels : numpy.ndarray of int32
+        The component of every actor. Freshly computed labels number the
+        components by decreasing size; after movies are added they may not.
+    sizes : numpy.ndarray of int64
+        The number of actors in every component.
+    """
+
+    def __init__(self, graph, labels=None):
+        """
+        Parameters
+        ----------
+        graph : CastGraph
+            The graph.
+        labels : numpy.ndarray, optional
+            Labels computed earlier, e.g. loaded from an index (default is None, compute them).
+        """
+        self.graph = graph
+        self.labels = componentLabels(graph) if labels is None else labels
+        self.sizes = np.bincount(self.labels, minlength=1)
+
+    def connected(self, source, target):
+        """
+        Returns whether two actor IDs are in the same component.
+        """
+        return self.labels[source] == self.labels[target]
+
+    def componentSize(self, actorId):
+        return int(self.sizes[self.labels[actorId]])
+
+    def numComponents(self):
+        return int(np.count_nonzero(self.sizes))
+
+    def largestSize(self):
+        return int(self.sizes.max()) if len(self.labels) else 0
+
+    def componentHistogram(self):
+        """
+        Returns a dict mapping every component size to the number of components of that size.
+        """
+        counts = np.bincount(self.sizes[self.sizes > 0])
+        return {size: int(count) for size, count in enumerate(counts) if count}
+
+    def movieHistogram(self):
+        """
+        Returns a dict mapping every number of movies per actor to its number of actors.
+        """
+        counts = np.bincount(np.diff(self.graph.actorOffsets))
+        return {degree: int(count) for degree, count in enumerate(counts) if count}
+
+    def castHistogram(self):
+        """
+        Returns a dict mapping every cast size to its number of movies.
+        """
+        counts = np.bincount(np.diff(self.graph.movieOffsets))
+        return {size: int(count) for size, count in enumerate(counts) if count}
+
+    def movieAdded(self, movieId):
+        """
+        Updates the labels after ``CastGraph.addMovie``, merging the components its cast joins.
+        """
+        if len(self.labels) < self.graph.numActors():
+            # New actors start out in components of their own.
+            first = int(self.sizes.shape[0])
+            added = self.graph.numActors() - len(self.labels)
+            self.labels = np.concatenate([self.labels, np.arange(first, first + added, dtype=np.int32)])
+        self.sizes = np.bincount(self.labels, minlength=1)
+        joined = np.unique(self.labels[self.graph.castOf(movieId)])
+        if len(joined) > 1:
+            # Keep the label of the biggest component joined.
+            keep = joined[np.argmax(self.sizes[joined])]
+            self.labels = np.where(np.isin(self.labels, joined), keep, self.labels).astype(np.int32)
+            self.sizes = np.bincount(self.labels, minlength=1)
+
+    def movieRemoved(self):
+        """
+        Labels the components again after ``CastGraph.removeMovie``, which may split one.
+        """
+        self.labels = componentLabels(self.graph)
+        self.sizes = np.bincount(self.labels, minlength=1)
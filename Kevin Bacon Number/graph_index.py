@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import numpy as np
+from cast_graph import CastGraph
+from components import ComponentIndex
+
+# Bump whenever the layout below changes; older index files are then rebuilt.
+INDEX_VERSION = 2
+
+ARRAYS = ('actorOffsets', 'actorMovies', 'movieOffsets', 'movieActors')
+
+
+def fileHash(fileName):
+    """
+    Returns the SHA-1 hex digest of a file's contents.
+    """
+    digest = hashlib.sha1()
+    with open(fileName, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sourceStamp(fileName):
+    """
+    Returns what an index records about its source file to detect changes.
+    """
+    stat = os.stat(fileName)
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': fileHash(fileName)}
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def save_index(graph, indexName, sourceName=None):
+    """
+    Writes a CastGraph to one versioned binary index file.
+
+    The file is a single ``.npy`` byte array: an 8-byte header length, a JSON
+    header with the version, source stamp and section layout, then the name
+    and title lists, the CSR arrays and the component labels if the graph has
+    them, each 8-byte aligned so ``load_index`` can map them without copying.
+
+    Parameters
+    ----------
+    graph : CastGraph
+        The graph to save.
+    indexName : str
+        The index file to write; it is replaced atomically.
+    sourceName : str, optional
+        The cast file the graph was parsed from, recorded so a stale index
+        can be detected (default is None, no check).
+    """
+    sections = {
+        'names': np.frombuffer('\n'.join(graph.names).encode('utf-8'), dtype=np.uint8),
+        'titles': np.frombuffer('\n'.join(graph.titles).encode('utf-8'), dtype=np.uint8),
+    }
+    for name in ARRAYS:
+        sections[name] = np.ascontiguousarray(getattr(graph, name))
+    if graph.components is not None:
+        sections['componentLabels'] = np.ascontiguousarray(graph.components.labels)
+    layout = {}
+    position = 0
+    for name, array in sections.items():
+        layout[name] = [position, len(array), array.dtype.str]
+        position = _aligned(position + array.nbytes)
+    header = json.dumps({
+        'version': INDEX_VERSION,
+        'actors': len(graph.names),
+        'movies': len(graph.titles),
+        'source': sourceStamp(sourceName) if sourceName else None,
+        'sections': layout,
+    }).encode('utf-8')
+    start = _aligned(8 + len(header))
+    blob = np.zeros(start + position, dtype=np.uint8)
+    blob[:8] = np.frombuffer(np.int64(len(header)).tobytes(), dtype=np.uint8)
+    blob[8:8 + len(header)] = np.frombuffer(header, dtype=np.uint8)
+    for name, array in sections.items():
+        offset = start + layout[name][0]
+        blob[offset:offset + array.nbytes] = array.view(np.uint8)
+    temp = indexName + '.tmp'
+    with open(temp, 'wb') as f:
+        np.save(f, blob)
+    os.replace(temp, indexName)
+
+
+def _restamp(indexName, blob, length, header, stat):
+    """
+    Records a source file's new mtime in an index header, in place.
+
+    Called once the hash showed the contents are unchanged, e.g. after a
+    ``touch`` or a checkout, so later loads skip hashing again. Returns False
+    if the new header does not fit in the old one.
+    """
+    header['source'].update(mtime=stat.st_mtime_ns, size=stat.st_size)
+    text = json.dumps(header).encode('utf-8')
+    if len(text) > length:
+        return False
+    with open(indexName, 'r+b') as f:
+        # JSON allows trailing whitespace, so pad to keep the length and the sections in place.
+        f.seek(blob.offset + 8)
+        f.write(text.ljust(length))
+    return True
+
+
+def load_index(indexName, sourceName=None):
+    """
+    Maps a CastGraph saved by ``save_index``.
+
+    The CSR arrays are read-only views into ``numpy.load(mmap_mode='r')``, so
+    loading costs only the name lists and the pages actually touched.
+
+    Parameters
+    ----------
+    indexName : str
+        The index file to read.
+    sourceName : str, optional
+        The cast file the index should match. If its mtime and size changed,
+        its hash is compared too, and a matching hash refreshes the recorded
+        mtime (default is None, no check).
+
+    Returns
+    -------
+    CastGraph or None
+        None if the index is missing, has another version, or is stale.
+    """
+    if not os.path.exists(indexName):
+        return None
+    blob = np.load(indexName, mmap_mode='r')
+    length = int(blob[:8].view(np.int64)[0])
+    header = json.loads(bytes(blob[8:8 + length]).decode('utf-8'))
+    if header['version'] != INDEX_VERSION:
+        return None
+    restamped = True
+    if sourceName is not None:
+        source = header['source']
+        if source is None:
+            return None
+        stat = os.stat(sourceName)
+        if (stat.st_mtime_ns, stat.st_size) != (source['mtime'], source['size']):
+            if fileHash(sourceName) != source['sha1']:
+                return None
+            restamped = _restamp(indexName, blob, length, header, stat)
+    start = _aligned(8 + length)
+    sections = {}
+    for name, (offset, size, dtype) in header['sections'].items():
+        dtype = np.dtype(dtype)
+        offset += start
+        sections[name] = blob[offset:offset + size * dtype.itemsize].view(dtype)
+    names = bytes(sections['names']).decode('utf-8').split('\n') if header['actors'] else []
+    titles = bytes(sections['titles']).decode('utf-8').split('\n') if header['movies'] else []
+    graph = CastGraph(names, titles, *(sections[name] for name in ARRAYS))
+    if 'componentLabels' in sections:
+        graph.components = ComponentIndex(graph, sections['componentLabels'])
+    if not restamped:
+        save_index(graph, indexName, sourceName)
+    return graph
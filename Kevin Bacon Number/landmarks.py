@@ -0,0 +1,169 @@
+import random
+import sys
+import time
+import numpy as np
+
+# The upper bound reported when no landmark reaches either actor.
+UNBOUNDED = np.iinfo(np.int32).max
+
+
+def pickLandmarks(graph, k):
+    """
+    Returns the IDs of the k actors with the most co-star credits.
+
+    An actor's score is the summed cast size of their movies, an upper bound
+    on their co-star count that is computed in one vectorized pass.
+    """
+    castSizes = np.diff(graph.movieOffsets)
+    movieCounts = np.diff(graph.actorOffsets)
+    actors = np.repeat(np.arange(graph.numActors()), movieCounts)
+    scores = np.bincount(actors, weights=castSizes[graph.actorMovies], minlength=graph.numActors())
+    k = min(k, graph.numActors())
+    return np.argsort(-scores, kind='stable')[:k]
+
+
+class LandmarkOracle:
+    """
+    Triangle-inequality bounds on Bacon numbers from a few precomputed searches.
+
+    For every landmark L, ``|d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)``.
+    Taking the best bound over k landmarks answers a query in O(k); when the
+    bounds meet, the path through the tightest landmark is a shortest path.
+
+    Attributes
+    ----------
+    graph : CastGraph
+        The graph the searches ran on.
+    landmarks : numpy.ndarray of int
+        The landmark actor IDs.
+    trees : list of SearchTree
+        The full BFS from every landmark.
+    distance : numpy.ndarray of int32
+        ``distance[i, a]`` is the Bacon number of actor ``a`` from landmark ``i``.
+    """
+
+    def __init__(self, graph, k=16):
+        """
+        Parameters
+        ----------
+        graph : CastGraph
+            The graph to search.
+        k : int, optional
+            The number of landmarks (default is 16).
+        """
+        self.graph = graph
+        self.landmarks = pickLandmarks(graph, k)
+        self.trees = [graph.bfs(int(landmark)) for landmark in self.landmarks]
+        self.refresh()
+
+    def refresh(self):
+        """
+        Restacks the distance matrix after the trees were repaired or replaced.
+        """
+        self.distance = np.stack([tree.distance for tree in self.trees]) if self.trees \
+            else np.empty((0, self.graph.numActors()), dtype=np.int32)
+
+    def movieAdded(self, movieId):
+        for tree in self.trees:
+            tree.movieAdded(movieId)
+        self.refresh()
+
+    def treesUsing(self, movieId):
+        """
+        Returns the indexes of the landmark trees with a path through a movie.
+        """
+        return [i for i, tree in enumerate(self.trees) if tree.usesMovie(movieId)]
+
+    def searchAgain(self, indexes):
+        """
+        Replaces the given landmark trees with fresh searches, e.g. after a movie they used was removed.
+        """
+        for i in indexes:
+            self.trees[i] = self.graph.bfs(int(self.landmarks[i]))
+        self.refresh()
+
+    def bounds(self, source, target):
+        """
+        Bounds the Bacon number between two actors.
+
+        Parameters
+        ----------
+        source, target : int
+            The actor IDs.
+
+        Returns
+        -------
+        tuple of int
+            ``(lower, upper, landmark)``, where ``landmark`` is the index of the
+            landmark giving ``upper``. ``(-1, -1, -1)`` means a landmark reaches
+            exactly one of the actors, so they are not connected; ``upper`` is
+            ``UNBOUNDED`` and ``landmark`` -1 when no landmark reaches either.
+        """
+        ds = self.distance[:, source]
+        dt = self.distance[:, target]
+        if ((ds >= 0) != (dt >= 0)).any():
+            return -1, -1, -1
+        both = np.flatnonzero(ds >= 0)
+        lower = int(source != target)
+        if len(both) == 0:
+            return lower, UNBOUNDED, -1
+        sums = ds[both] + dt[both]
+        best = int(np.argmin(sums))
+        lower = max(lower, int(np.abs(ds[both] - dt[both]).max()))
+        return lower, int(sums[best]), int(both[best])
+
+    def path(self, source, target, landmark):
+        """
+        Returns the path from source to target through a landmark, as names and titles.
+        """
+        tree = self.trees[landmark]
+        return tree.path(source)[::-1] + tree.path(target)[1:]
+
+
+def benchmark(calculator, pairs=1000, seed=17):
+    """
+    Reports how often the landmark bounds answer random queries without a BFS.
+
+    Parameters
+    ----------
+    calculator : BaconNumberCalculator
+        A calculator with landmarks built.
+    pairs : int, optional
+        The number of random actor pairs to query (default is 1000).
+    seed : int, optional
+        The seed for choosing the pairs (default is 17).
+
+    Returns
+    -------
+    dict
+        The hit rate, the average bound gap on misses, and the seconds spent
+        on bounds alone and on full queries.
+    """
+    rng = random.Random(seed)
+    names = calculator.graph.names
+    queries = [(rng.randrange(len(names)), rng.randrange(len(names))) for _ in range(pairs)]
+    start = time.perf_counter()
+    results = [calculator.landmarks.bounds(s, t) for s, t in queries]
+    boundsTime = time.perf_counter() - start
+    hits = sum(lower == upper for lower, upper, _ in results)
+    gaps = [upper - lower for lower, upper, _ in results if lower != upper and upper != UNBOUNDED]
+    start = time.perf_counter()
+    for s, t in queries:
+        calculator.calcBaconNumber(names[s], names[t])
+    queryTime = time.perf_counter() - start
+    return {
+        'pairs': pairs,
+        'landmarks': len(calculator.landmarks.landmarks),
+        'hitRate': hits / pairs,
+        'averageGap': sum(gaps) / len(gaps) if gaps else 0.0,
+        'boundsSeconds': boundsTime,
+        'querySeconds': queryTime,
+    }
+
+
+if __name__ == "__main__":
+    # python landmarks.py data/PopularCast.txt 16
+    from bacon_number import BaconNumberCalculator
+    calculator = BaconNumberCalculator(sys.argv[1])
+    calculator.buildLandmarks(int(sys.argv[2]) if len(sys.argv) > 2 else 16)
+    print(benchmark(calculator))
@@ -0,0 +1,84 @@
+import numpy as np
+from cast_graph import gather
+
+
+def movieFilter(graph, minYear=None, maxYear=None):
+    """
+    Returns a bitmap of the movies released between two years, inclusive.
+
+    Parameters
+    ----------
+    graph : CastGraph
+        The graph.
+    minYear, maxYear : int, optional
+        The year range; movies without a year in their title are excluded
+        once either is given (default is None, no limit).
+
+    Returns
+    -------
+    numpy.ndarray of bool or None
+        None if neither year is given, i.e. every movie is allowed.
+    """
+    if minYear is None and maxYear is None:
+        return None
+    years = graph.movieYears()
+    allowed = years >= 0
+    if minYear is not None:
+        allowed &= years >= minYear
+    if maxYear is not None:
+        allowed &= years <= maxYear
+    return allowed
+
+
+def kHop(graph, source, k, minYear=None, maxYear=None):
+    """
+    Lazily yields every actor within k hops of a source actor, ring by ring.
+
+    Each ring is expanded with bitmaps over the actor and movie ID space:
+    the previous ring's movies are marked once, and every actor in them
+    that is not yet seen is counted with one bincount. Within a ring,
+    actors are ranked by their score, the number of distinct films linking
+    them to the previous ring; for the first ring that is the number of
+    films shared with the source. The next ring is only computed when the
+    consumer asks for more.
+
+    Parameters
+    ----------
+    graph : CastGraph
+        The graph to search.
+    source : int
+        The ID of the source actor.
+    k : int
+        The largest number of hops.
+    minYear, maxYear : int, optional
+        Only follow movies released in this year range (default is None, all movies).
+
+    Yields
+    ------
+    tuple of (int, int, int)
+        ``(actorId, hops, score)``, nearest rings first and highest score first.
+    """
+    allowed = movieFilter(graph, minYear, maxYear)
+    seen = np.zeros(graph.numActors(), dtype=bool)
+    usedMovies = np.zeros(graph.numMovies(), dtype=bool)
+    seen[source] = True
+    ring = np.array([source], dtype=np.int64)
+    for hops in range(1, k + 1):
+        _, movies = gather(graph.actorOffsets, graph.actorMovies, ring)
+        marked = np.zeros(graph.numMovies(), dtype=bool)
+        marked[movies] = True
+        # A movie only links a ring to the next one the first time it is reached.
+        marked &= ~usedMovies
+        if allowed is not None:
+            marked &= allowed
+        usedMovies |= marked
+        _, actors = gather(graph.movieOffsets, graph.movieActors, np.flatnonzero(marked))
+        scores = np.bincount(actors, minlength=graph.numActors())
+        scores[seen] = 0
+        ring = np.flatnonzero(scores)
+        if len(ring) == 0:
+            return
+        seen[ring] = True
+        ranked = ring[np.argsort(-scores[ring], kind='stable')]
+        for actorId in ranked:
+            yield int(actorId), hops, int(scores[actorId])
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+
+
+class TreeCache:
+    """
+    A bounded least-recently-used cache of full BFS search trees, keyed by source actor.
+
+    With a source's tree cached, the path to any target is rebuilt from its
+    parent arrays in O(path length), without searching again.
+
+    Attributes
+    ----------
+    graph : CastGraph
+        The graph the trees are searched on.
+    maxSize : int
+        The most trees kept; the least recently used one is evicted first.
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups that had to run a BFS.
+    """
+
+    def __init__(self, graph, maxSize=64):
+        """
+        Parameters
+        ----------
+        graph : CastGraph
+            The graph to search.
+        maxSize : int, optional
+            The most trees kept (default is 64). Every tree holds three int
+            arrays over the actors and movies, about 1 MB on PopularCast.txt.
+        """
+        self.graph = graph
+        self.maxSize = maxSize
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.trees)
+
+    def __contains__(self, source):
+        return source in self.trees
+
+    def get(self, source):
+        """
+        Returns the full search tree of a source actor, searching on a miss.
+
+        Parameters
+        ----------
+        source : int
+            The ID of the source actor.
+
+        Returns
+        -------
+        SearchTree
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return tree
+        self.misses += 1
+        tree = self.graph.bfs(source)
+        if self.maxSize > 0:
+            self.trees[source] = tree
+            if len(self.trees) > self.maxSize:
+                self.trees.popitem(last=False)
+        return tree
+
+    def cached(self, source):
+        """
+        Returns the cached tree of a source actor, or None without searching or counting a miss.
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+        return tree
+
+    def clear(self):
+        self.trees.clear()
+
+    def stats(self):
+        """
+        Returns the hit and miss counters, the hit rate and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+            'size': len(self.trees),
+            'maxSize': self.maxSize,
+        }
@@ -0,0 +1,137 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from bacon_number import BaconNumberCalculator
+from unittest_cast_graph import DATA, distances, readCasts
+
+FILE_NAME = os.path.join(DATA, 'Bacon_06.txt')
+
+
+class TestBaconNumber(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.indexName = os.path.join(self.directory, 'Bacon_06.idx')
+        self.journalName = os.path.join(self.directory, 'Bacon_06.journal')
+        self.casts = readCasts('Bacon_06.txt')
+        self.rng = random.Random(507)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def calculator(self, **kwargs):
+        return BaconNumberCalculator(FILE_NAME, indexName=self.indexName, journalName=self.journalName, **kwargs)
+
+    def mutate(self, calculator, steps=30):
+        # Random additions and removals, mirrored on self.casts.
+        actors = sorted(calculator.adjList)
+        for step in range(steps):
+            if step % 3 == 2:
+                title = self.rng.choice(sorted(self.casts))
+                self.assertTrue(calculator.remove_movie(title))
+                del self.casts[title]
+            else:
+                title = self.rng.choice(sorted(self.casts)) if step % 3 else 'New Movie %d (2006)' % step
+                cast = self.rng.sample(actors, 3) + ['Newcomer %d' % step]
+                calculator.add_movie(title, cast)
+                self.casts.setdefault(title, set()).update(cast)
+        self.assertFalse(calculator.remove_movie('No Such Movie'))
+
+    def assertNumbersMatch(self, calculator, source, count=200, bidirectional=False):
+        expected = distances(self.casts, source)
+        for actor in self.rng.sample(sorted(calculator.adjList), count):
+            number, path = calculator.calcBaconNumber(source, actor, bidirectional)
+            self.assertEqual(number, expected.get(actor, -1), actor)
+            if number > 0:
+                self.assertEqual(len(path), 2 * number + 1)
+                self.assertEqual((path[0], path[-1]), (source, actor))
+                for i in range(1, len(path), 2):
+                    self.assertIn(path[i - 1], self.casts[path[i]])
+                    self.assertIn(path[i + 1], self.casts[path[i]])
+
+    def test_calcBaconNumber(self):
+        calculator = BaconNumberCalculator(FILE_NAME)
+        self.assertEqual(calculator.calcBaconNumber('Bacon, Kevin', 'Bacon, Kevin'), [0, ['Bacon, Kevin']])
+        self.assertEqual(calculator.calcBaconNumber('Bacon, Kevin', 'No Such Actor'), [-1, []])
+        self.assertNumbersMatch(calculator, 'Bacon, Kevin')
+
+    def test_bidirectional(self):
+        for calculator in (BaconNumberCalculator(FILE_NAME), BaconNumberCalculator(FILE_NAME, cacheSize=4)):
+            self.assertEqual(calculator.calcBaconNumber('Bacon, Kevin', 'Bacon, Kevin', bidirectional=True),
+                             [0, ['Bacon, Kevin']])
+            self.assertEqual(calculator.calcBaconNumber('Bacon, Kevin', 'No Such Actor', bidirectional=True),
+                             [-1, []])
+            self.assertNumbersMatch(calculator, 'Bacon, Kevin', bidirectional=True)
+            # The search only runs from both ends when no tree is cached for either of them
+            self.assertEqual(calculator.treeCache.misses, 0)
+
+    def test_repair(self):
+        calculator = self.calculator(cacheSize=4)
+        calculator.buildLandmarks(4)
+        calculator.baconTable('Bacon, Kevin')
+        source = sorted(calculator.adjList)[200]
+        calculator.treeCache.get(calculator.graph.actorId(source))
+        self.mutate(calculator)
+        # The cached table, search trees and landmarks must agree with a fresh search.
+        expected = distances(self.casts, 'Bacon, Kevin')
+        table = calculator.baconTable('Bacon, Kevin')
+        for actor in calculator.adjList:
+            self.assertEqual(table.number(actor), expected.get(actor, -1), actor)
+        self.assertNumbersMatch(calculator, 'Bacon, Kevin')
+        self.assertNumbersMatch(calculator, source)
+        self.assertNumbersMatch(calculator, 'Newcomer 3')
+
+    def test_replayJournal(self):
+        calculator = self.calculator()
+        self.mutate(calculator)
+        # A new calculator loads the saved index and replays the journal onto it.
+        replayed = self.calculator()
+        self.assertEqual(sorted(replayed.adjList), sorted(calculator.adjList))
+        self.assertNumbersMatch(replayed, 'Bacon, Kevin')
+        self.assertNumbersMatch(replayed, 'Newcomer 0')
+
+    def test_checkpoint(self):
+        calculator = self.calculator()
+        self.mutate(calculator)
+        calculator.checkpoint()
+        self.assertEqual(os.path.getsize(self.journalName), 0)
+        restored = self.calculator()
+        self.assertNumbersMatch(restored, 'Bacon, Kevin')
+        self.assertNumbersMatch(restored, 'Newcomer 0')
+        with self.assertRaises(ValueError):
+            BaconNumberCalculator(FILE_NAME).checkpoint()
+
+
+class TestPaths(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = BaconNumberCalculator(os.path.join(DATA, 'mimi_graph.txt'))
+
+    def test_movie_titles(self):
+        self.assertEqual(self.calculator.calcBaconNumber('B', 'C'), [1, ['B', 'Movie1', 'C']])
+        self.assertEqual(self.calculator.calcBaconNumber('G', 'P'), [1, ['G', 'Movie3', 'P']])
+        self.assertIn(self.calculator.calcBaconNumber('A', 'P'),
+                      [[2, ['A', 'Movie2', 'G', 'Movie3', 'P']], [2, ['A', 'Movie5', 'F', 'Movie4', 'P']]])
+        self.assertIn(self.calculator.calcBaconNumber('D', 'P'),
+                      [[3, ['D', 'Movie1', 'A', 'Movie2', 'G', 'Movie3', 'P']],
+                       [3, ['D', 'Movie1', 'A', 'Movie5', 'F', 'Movie4', 'P']]])
+
+    def test_reverse(self):
+        # Both directions give a path of the same length, each through the movies the actors share
+        casts = readCasts('mimi_graph.txt')
+        for source in 'ABCDFGP':
+            for target in 'ABCDFGP':
+                number, path = self.calculator.calcBaconNumber(source, target)
+                self.assertEqual(number, self.calculator.calcBaconNumber(target, source)[0])
+                self.assertEqual(number, distances(casts, source)[target])
+                self.assertEqual(len(set(path)), len(path))
+                for i in range(1, len(path), 2):
+                    self.assertIn(path[i - 1], casts[path[i]])
+                    self.assertIn(path[i + 1], casts[path[i]])
+
+
+if __name__ == "__main__":
+    unittest.main()
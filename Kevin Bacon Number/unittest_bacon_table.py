@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from bacon_number import BaconNumberCalculator
+from bacon_table import BaconTable
+from cast_graph import CastGraph
+from unittest_cast_graph import DATA, distances, readCasts
+
+
+class TestBaconTable(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = CastGraph.fromFile(os.path.join(DATA, 'mimi_graph.txt'))
+        self.table = BaconTable(self.graph, self.graph.actorId('A'))
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_number(self):
+        self.assertEqual(self.table.number('A'), 0)
+        self.assertEqual(self.table.number('G'), 1)
+        self.assertEqual(self.table.number('P'), 2)
+        self.assertEqual(self.table.number('No Such Actor'), -1)
+
+    def test_histogram(self):
+        self.assertEqual(self.table.histogram(), {0: 1, 1: 5, 2: 1})
+        self.assertEqual(self.table.reachable(), 7)
+        self.assertEqual(self.table.average(), 1.0)
+        self.assertEqual(self.table.eccentricity(), 2)
+
+    def test_percentile(self):
+        self.assertEqual(self.table.percentile(0), 0)
+        self.assertEqual(self.table.percentile(10), 0)
+        self.assertEqual(self.table.percentile(50), 1)
+        self.assertEqual(self.table.percentile(85), 1)
+        self.assertEqual(self.table.percentile(90), 2)
+        self.assertEqual(self.table.percentile(100), 2)
+
+    def test_save_load(self):
+        for fileName in ('table', 'table.npy'):
+            path = os.path.join(self.directory, fileName)
+            self.table.save(path)
+            self.assertTrue(os.path.exists(path))
+            loaded = BaconTable.load(self.graph, path)
+            self.assertEqual(loaded.center, self.table.center)
+            self.assertTrue(np.array_equal(loaded.distance, self.table.distance))
+            self.assertEqual(loaded.histogram(), self.table.histogram())
+
+    def test_load_other_graph(self):
+        path = os.path.join(self.directory, 'table.npy')
+        self.table.save(path)
+        other = CastGraph.fromFile(os.path.join(DATA, 'Bacon_06.txt'))
+        with self.assertRaises(ValueError):
+            BaconTable.load(other, path)
+
+
+class TestCalculatorTables(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = BaconNumberCalculator(os.path.join(DATA, 'Bacon_06.txt'), tableCacheSize=2)
+        self.actors = sorted(self.calculator.adjList)
+
+    def test_matches_search(self):
+        expected = distances(readCasts('Bacon_06.txt'), 'Bacon, Kevin')
+        table = self.calculator.baconTable('Bacon, Kevin')
+        for actor in self.actors[::50]:
+            self.assertEqual(table.number(actor), expected.get(actor, -1), actor)
+        self.assertEqual(table.reachable(), len(expected))
+        self.assertAlmostEqual(table.average(), sum(expected.values()) / len(expected))
+        self.assertIsNone(self.calculator.baconTable('No Such Actor'))
+
+    def test_lru(self):
+        first = self.calculator.baconTable(self.actors[0])
+        self.calculator.baconTable(self.actors[1])
+        self.assertIs(self.calculator.baconTable(self.actors[0]), first)
+        self.calculator.baconTable(self.actors[2])
+        # The least recently used table is evicted first
+        self.assertEqual(list(self.calculator.baconTables), [self.actors[0], self.actors[2]])
+
+    def test_calcAvgNumber(self):
+        expected = self.calculator.baconTable('Bacon, Kevin').average()
+        self.calculator.baconTables.clear()
+        for actor in self.actors[:20]:
+            self.calculator.calcAvgNumber(actor, 0.1)
+        self.assertEqual(len(self.calculator.baconTables), 0)
+        self.assertEqual(self.calculator.calcAvgNumber('Bacon, Kevin', 0.1), expected)
+        self.assertEqual(self.calculator.calcAvgNumber('No Such Actor', 0.1), -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
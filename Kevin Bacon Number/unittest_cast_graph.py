@@ -0,0 +1,266 @@
+import os
+import random
+import tracemalloc
+import unittest
+from collections import deque
+
+from cast_graph import CastGraph
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def readCasts(fileName):
+    casts = {}
+    with open(os.path.join(DATA, fileName), 'r', encoding='ISO-8859-1') as f:
+        for line in f:
+            fields = line.strip().split('/')
+            if fields[0]:
+                casts.setdefault(fields[0], set()).update(fields[1:])
+    return casts
+
+
+def buildGraph(casts):
+    names = sorted(set().union(*casts.values()))
+    titles = sorted(casts)
+    ids = {name: i for i, name in enumerate(names)}
+    movieOf, actorOf = [], []
+    for movieId, title in enumerate(titles):
+        for actor in casts[title]:
+            movieOf.append(movieId)
+            actorOf.append(ids[actor])
+    return CastGraph.fromIncidence(names, titles, movieOf, actorOf)
+
+
+def distances(casts, source):
+    # A plain dictionary BFS over actor -> movie -> actor, the reference for the CSR searches.
+    movies = {}
+    for title, cast in casts.items():
+        for actor in cast:
+            movies.setdefault(actor, []).append(title)
+    found = {source: 0}
+    seen = set()
+    queue = deque([source])
+    while queue:
+        actor = queue.popleft()
+        for title in movies.get(actor, ()):
+            if title in seen:
+                continue
+            seen.add(title)
+            for other in casts[title]:
+                if other not in found:
+                    found[other] = found[actor] + 1
+                    queue.append(other)
+    return found
+
+
+class GraphTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.casts = readCasts('Bacon_06.txt')
+        self.graph = buildGraph(self.casts)
+        self.actors = sorted(self.graph.names)
+        self.rng = random.Random(507)
+
+    def assertValidPath(self, casts, path, source, target, number):
+        self.assertEqual(len(path), 2 * number + 1)
+        self.assertEqual(path[0], source)
+        self.assertEqual(path[-1], target)
+        for i in range(1, len(path), 2):
+            self.assertIn(path[i - 1], casts[path[i]])
+            self.assertIn(path[i + 1], casts[path[i]])
+
+    def assertSearchMatches(self, graph, casts, source):
+        expected = distances(casts, source)
+        tree = graph.bfs(graph.actorId(source))
+        for actor in self.rng.sample(self.actors, 200):
+            actorId = graph.actorId(actor)
+            self.assertEqual(tree.distance[actorId], expected.get(actor, -1), actor)
+            path = tree.path(actorId)
+            if actor in expected:
+                self.assertValidPath(casts, path, source, actor, expected[actor])
+            else:
+                self.assertEqual(path, [])
+
+
+class TestCSR(GraphTestCase):
+
+    def test_fromFile(self):
+        graph = CastGraph.fromFile(os.path.join(DATA, 'mimi_graph.txt'))
+        self.assertEqual(len(graph), 7)
+        self.assertEqual(graph.numMovies(), 5)
+        self.assertEqual(sorted(graph.names), ['A', 'B', 'C', 'D', 'F', 'G', 'P'])
+        self.assertIn('A', graph)
+        self.assertNotIn('Z', graph)
+        self.assertEqual(graph.actorId('Z'), -1)
+        self.assertEqual(sorted(graph.neighborIds(graph.actorId('G'))),
+                         sorted([graph.actorId('A'), graph.actorId('P')]))
+        self.assertEqual(sorted(graph.titles[m] for m in graph.moviesOf(graph.actorId('A'))),
+                         ['Movie1', 'Movie2', 'Movie5'])
+
+    def test_csr(self):
+        graph = CastGraph.fromFile(os.path.join(DATA, 'Bacon_06.txt'))
+        self.assertEqual(sorted(graph.names), self.actors)
+        self.assertEqual(sorted(graph.titles), sorted(self.casts))
+        for offsets, values, rows in ((graph.actorOffsets, graph.actorMovies, graph.numActors()),
+                                      (graph.movieOffsets, graph.movieActors, graph.numMovies())):
+            self.assertEqual(len(offsets), rows + 1)
+            self.assertEqual(offsets[0], 0)
+            self.assertEqual(offsets[-1], len(values))
+            self.assertTrue((offsets[1:] >= offsets[:-1]).all())
+        # Both directions hold the same credits, and every row is sorted
+        credits = {(m, a) for m in range(graph.numMovies()) for a in graph.castOf(m).tolist()}
+        self.assertEqual(credits, {(m, a) for a in range(graph.numActors()) for m in graph.moviesOf(a).tolist()})
+        for title in self.rng.sample(sorted(self.casts), 200):
+            cast = graph.castOf(graph.titleIds[title])
+            self.assertEqual(cast.tolist(), sorted(cast.tolist()))
+            self.assertEqual({graph.names[a] for a in cast}, self.casts[title])
+
+    def test_fromIncidence(self):
+        # A repeated credit is stored once
+        graph = CastGraph.fromIncidence(['A', 'B', 'C'], ['M', 'N'], [0, 0, 0, 1, 1], [0, 1, 0, 2, 1])
+        self.assertEqual(graph.castOf(0).tolist(), [0, 1])
+        self.assertEqual(graph.castOf(1).tolist(), [1, 2])
+        self.assertEqual(graph.moviesOf(1).tolist(), [0, 1])
+        self.assertEqual(sorted(graph.neighborIds(1)), [0, 2])
+
+    def test_bfs(self):
+        for source in self.rng.sample(self.actors, 3):
+            self.assertSearchMatches(self.graph, self.casts, source)
+
+    def test_bfs_target(self):
+        source, target = self.rng.sample(self.actors, 2)
+        expected = distances(self.casts, source).get(target, -1)
+        tree = self.graph.bfs(self.graph.actorId(source), self.graph.actorId(target))
+        self.assertEqual(tree.distance[self.graph.actorId(target)], expected)
+
+
+class TestBidirectional(GraphTestCase):
+
+    def test_bidirectionalPath(self):
+        for _ in range(50):
+            source, target = self.rng.sample(self.actors, 2)
+            expected = distances(self.casts, source)
+            path = self.graph.bidirectionalPath(self.graph.actorId(source), self.graph.actorId(target))
+            if target in expected:
+                self.assertValidPath(self.casts, path, source, target, expected[target])
+            else:
+                self.assertEqual(path, [])
+        self.assertEqual(self.graph.bidirectionalPath(0, 0), [self.graph.names[0]])
+
+    def test_distant_pairs(self):
+        # Pairs far apart, where the two frontiers meet in the middle of a long path
+        source = self.actors[0]
+        expected = distances(self.casts, source)
+        far = sorted(expected, key=lambda actor: (-expected[actor], actor))[:20]
+        self.assertGreaterEqual(expected[far[-1]], 4)
+        for target in far:
+            path = self.graph.bidirectionalPath(self.graph.actorId(source), self.graph.actorId(target))
+            self.assertValidPath(self.casts, path, source, target, expected[target])
+            path = self.graph.bidirectionalPath(self.graph.actorId(target), self.graph.actorId(source))
+            self.assertValidPath(self.casts, path, target, source, expected[target])
+
+    def test_neighbors(self):
+        graph = CastGraph.fromFile(os.path.join(DATA, 'mimi_graph.txt'))
+        path = graph.bidirectionalPath(graph.actorId('B'), graph.actorId('C'))
+        self.assertEqual(path, ['B', 'Movie1', 'C'])
+
+
+class TestMutation(GraphTestCase):
+
+    def test_addMovie(self):
+        casts = {title: set(cast) for title, cast in self.casts.items()}
+        titles = sorted(casts)
+        for step in range(20):
+            title = titles[step * 7] if step % 2 else 'New Movie %d (2006)' % step
+            cast = self.rng.sample(self.actors, 3) + ['Newcomer %d' % step]
+            self.graph.addMovie(title, cast)
+            casts.setdefault(title, set()).update(cast)
+        self.actors = sorted(self.graph.names)
+        rebuilt = buildGraph(casts)
+        for actor in self.rng.sample(self.actors, 50):
+            self.assertEqual(sorted(self.graph.names[i] for i in self.graph.neighborIds(self.graph.actorId(actor))),
+                             sorted(rebuilt.names[i] for i in rebuilt.neighborIds(rebuilt.actorId(actor))))
+        for source in self.rng.sample(self.actors, 2) + ['Newcomer 3']:
+            self.assertSearchMatches(self.graph, casts, source)
+
+    def test_removeMovie(self):
+        casts = {title: set(cast) for title, cast in self.casts.items()}
+        for title in self.rng.sample(sorted(casts), 200):
+            self.assertNotEqual(self.graph.removeMovie(title), -1)
+            del casts[title]
+        self.assertEqual(self.graph.removeMovie('No Such Movie'), -1)
+        for source in self.rng.sample(self.actors, 3):
+            self.assertSearchMatches(self.graph, casts, source)
+
+    def test_relaxMovie(self):
+        casts = {title: set(cast) for title, cast in self.casts.items()}
+        source = self.actors[100]
+        tree = self.graph.bfs(self.graph.actorId(source))
+        for step in range(20):
+            title = 'Short Cut %d (2006)' % step
+            cast = self.rng.sample(self.actors, 2) + ['Newcomer %d' % step]
+            movieId = self.graph.addMovie(title, cast)
+            tree.movieAdded(movieId)
+            casts[title] = set(cast)
+        self.actors = sorted(self.graph.names)
+        expected = distances(casts, source)
+        for actor in self.rng.sample(self.actors, 300):
+            actorId = self.graph.actorId(actor)
+            self.assertEqual(tree.distance[actorId], expected.get(actor, -1), actor)
+            if actor in expected:
+                self.assertValidPath(casts, tree.path(actorId), source, actor, expected[actor])
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.fileName = os.path.join(DATA, 'Bacon_06.txt')
+
+    def assertSameGraph(self, graph, expected):
+        self.assertEqual(graph.names, expected.names)
+        self.assertEqual(graph.titles, expected.titles)
+        for name in ('actorOffsets', 'actorMovies', 'movieOffsets', 'movieActors'):
+            self.assertEqual(getattr(graph, name).tolist(), getattr(expected, name).tolist(), name)
+
+    def test_progress(self):
+        calls = []
+        original = CastGraph.BLOCK_SIZE
+        CastGraph.BLOCK_SIZE = 1 << 16
+        try:
+            graph = CastGraph.fromFile(self.fileName, progress=lambda done, total: calls.append((done, total)))
+        finally:
+            CastGraph.BLOCK_SIZE = original
+        total = os.path.getsize(self.fileName)
+        self.assertGreater(len(calls), total // (1 << 16))
+        self.assertEqual([done for done, _ in calls], sorted(done for done, _ in calls))
+        self.assertEqual(calls[-1], (total, total))
+        # Lines split across blocks are put back together
+        self.assertSameGraph(graph, CastGraph.fromFile(self.fileName))
+
+    def test_maxMemory(self):
+        with self.assertRaises(MemoryError):
+            CastGraph.fromFile(self.fileName, maxMemory=1 << 20)
+        budget = 32 << 20
+        tracemalloc.start()
+        try:
+            graph = CastGraph.fromFile(self.fileName, maxMemory=budget)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, budget)
+        self.assertSameGraph(graph, CastGraph.fromFile(self.fileName))
+
+    def test_budget_covers_names(self):
+        # The smallest accepted budget must still cover the measured peak, names and titles included
+        tracemalloc.start()
+        try:
+            CastGraph.fromFile(self.fileName)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        with self.assertRaises(MemoryError):
+            CastGraph.fromFile(self.fileName, maxMemory=peak * 2 // 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
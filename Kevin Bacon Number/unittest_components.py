@@ -0,0 +1,108 @@
+import os
+import unittest
+from unittest import mock
+
+from bacon_number import BaconNumberCalculator
+from cast_graph import CastGraph
+from components import ComponentIndex, componentLabels
+from unittest_cast_graph import DATA, buildGraph, readCasts
+
+
+def components(casts):
+    """
+    Reference components, from one depth-first walk over the whole file.
+    """
+    moviesOf = {}
+    for title, cast in casts.items():
+        for actor in cast:
+            moviesOf.setdefault(actor, []).append(title)
+    found = []
+    seen = set()
+    for actor in sorted(moviesOf):
+        if actor in seen:
+            continue
+        component = {actor}
+        stack = [actor]
+        while stack:
+            for title in moviesOf[stack.pop()]:
+                for other in casts[title] - component:
+                    component.add(other)
+                    stack.append(other)
+        seen |= component
+        found.append(component)
+    return found
+
+
+class TestComponents(unittest.TestCase):
+
+    def setUp(self):
+        self.casts = readCasts('Bacon_06.txt')
+        self.graph = buildGraph(self.casts)
+        self.components = sorted(components(self.casts), key=len, reverse=True)
+
+    def assertLabelsMatch(self, graph, labels, expected):
+        self.assertEqual(len(set(labels.tolist())), len(expected))
+        for component in expected:
+            self.assertEqual(len(set(labels[[graph.actorId(name) for name in component]])), 1)
+
+    def test_componentLabels(self):
+        labels = componentLabels(self.graph)
+        self.assertLabelsMatch(self.graph, labels, self.components)
+        self.assertEqual(labels.max() + 1, len(self.components))
+        # Component 0 is the largest one.
+        self.assertEqual((labels == 0).sum(), len(self.components[0]))
+
+    def test_index(self):
+        index = ComponentIndex(self.graph)
+        self.assertEqual(index.numComponents(), len(self.components))
+        self.assertEqual(index.largestSize(), len(self.components[0]))
+        sizes = {}
+        for component in self.components:
+            sizes[len(component)] = sizes.get(len(component), 0) + 1
+        self.assertEqual(index.componentHistogram(), sizes)
+        big, small = sorted(self.components[0]), sorted(self.components[-1])
+        self.assertTrue(index.connected(self.graph.actorId(big[0]), self.graph.actorId(big[-1])))
+        self.assertFalse(index.connected(self.graph.actorId(big[0]), self.graph.actorId(small[0])))
+        self.assertEqual(index.componentSize(self.graph.actorId(small[0])), len(small))
+
+    def test_histograms(self):
+        index = ComponentIndex(CastGraph.fromFile(os.path.join(DATA, 'mimi_graph.txt')))
+        self.assertEqual(index.componentHistogram(), {7: 1})
+        self.assertEqual(index.movieHistogram(), {1: 3, 2: 3, 3: 1})
+        self.assertEqual(index.castHistogram(), {2: 4, 4: 1})
+        self.assertEqual(sum(ComponentIndex(self.graph).movieHistogram().values()), self.graph.numActors())
+        self.assertEqual(sum(ComponentIndex(self.graph).castHistogram().values()), self.graph.numMovies())
+
+    def test_movieAdded_and_movieRemoved(self):
+        index = ComponentIndex(self.graph)
+        bridged = [sorted(component)[0] for component in self.components[-3:]]
+        cast = bridged + [sorted(self.components[0])[0], 'Newcomer']
+        index.movieAdded(self.graph.addMovie('Bridge (2006)', cast))
+        self.casts['Bridge (2006)'] = set(cast)
+        expected = components(self.casts)
+        self.assertLabelsMatch(self.graph, index.labels, expected)
+        self.assertEqual(index.numComponents(), len(expected))
+        self.assertEqual(index.largestSize(), len(self.components[0]) + sum(map(len, self.components[-3:])) + 1)
+        self.assertEqual(index.componentSize(self.graph.actorId('Newcomer')), index.largestSize())
+        # Removing the movie splits the components again
+        self.graph.removeMovie('Bridge (2006)')
+        index.movieRemoved()
+        del self.casts['Bridge (2006)']
+        self.assertEqual(index.numComponents(), len(self.components) + 1)
+        self.assertEqual(index.componentSize(self.graph.actorId('Newcomer')), 1)
+        self.assertFalse(index.connected(self.graph.actorId(bridged[0]), self.graph.actorId(bridged[1])))
+
+    def test_calculator(self):
+        calculator = BaconNumberCalculator(os.path.join(DATA, 'Bacon_06.txt'))
+        outside = sorted(self.components[-1])[0]
+        # Actors in other components are answered without a search
+        with mock.patch.object(calculator.graph, 'bfs') as bfs, \
+                mock.patch.object(calculator.graph, 'bidirectionalPath') as bidirectionalPath:
+            self.assertEqual(calculator.calcBaconNumber('Bacon, Kevin', outside), [-1, []])
+            self.assertEqual(calculator.calcBaconNumber(outside, 'Bacon, Kevin', bidirectional=True), [-1, []])
+        bfs.assert_not_called()
+        bidirectionalPath.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
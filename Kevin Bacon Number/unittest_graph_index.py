@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import graph_index
+from cast_graph import CastGraph
+from components import ComponentIndex
+from graph_index import load_index, save_index
+from unittest_cast_graph import DATA
+
+
+def readHeader(indexName):
+    blob = np.load(indexName, mmap_mode='r')
+    length = int(blob[:8].view(np.int64)[0])
+    return json.loads(bytes(blob[8:8 + length]).decode('utf-8'))
+
+
+class TestGraphIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sourceName = os.path.join(self.directory, 'Bacon_06.txt')
+        self.indexName = os.path.join(self.directory, 'Bacon_06.idx')
+        shutil.copy(os.path.join(DATA, 'Bacon_06.txt'), self.sourceName)
+        self.graph = CastGraph.fromFile(self.sourceName)
+        self.graph.components = ComponentIndex(self.graph)
+        save_index(self.graph, self.indexName, self.sourceName)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSameGraph(self, graph, expected):
+        self.assertEqual(graph.names, expected.names)
+        self.assertEqual(graph.titles, expected.titles)
+        for name in graph_index.ARRAYS:
+            self.assertTrue(np.array_equal(getattr(graph, name), getattr(expected, name)), name)
+
+    def test_round_trip(self):
+        graph = load_index(self.indexName, self.sourceName)
+        self.assertSameGraph(graph, self.graph)
+        self.assertTrue(np.array_equal(graph.components.labels, self.graph.components.labels))
+        # The arrays are read-only views of the mapped file
+        self.assertFalse(graph.actorMovies.flags.writeable)
+        self.assertEqual(load_index(self.indexName).names, self.graph.names)
+
+    def test_missing_or_other_version(self):
+        self.assertIsNone(load_index(os.path.join(self.directory, 'missing.idx'), self.sourceName))
+        with mock.patch.object(graph_index, 'INDEX_VERSION', graph_index.INDEX_VERSION + 1):
+            self.assertIsNone(load_index(self.indexName, self.sourceName))
+        # An index saved without a source stamp cannot be checked against one
+        save_index(self.graph, self.indexName)
+        self.assertIsNone(load_index(self.indexName, self.sourceName))
+
+    def test_changed_source(self):
+        with open(self.sourceName, 'a', encoding='ISO-8859-1') as f:
+            f.write('New Movie (2006)/Bacon, Kevin/Newcomer\n')
+        self.assertIsNone(load_index(self.indexName, self.sourceName))
+
+    def test_same_size_change(self):
+        # Same size, same mtime as far as the stamp goes: only the hash can tell
+        stat = os.stat(self.sourceName)
+        with open(self.sourceName, 'r+b') as f:
+            f.seek(1)
+            byte = f.read(1)
+            f.seek(1)
+            f.write(b'X' if byte != b'X' else b'Y')
+        os.utime(self.sourceName, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIsNone(load_index(self.indexName, self.sourceName))
+
+    def test_restamp(self):
+        stat = os.stat(self.sourceName)
+        os.utime(self.sourceName, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        size = os.path.getsize(self.indexName)
+        self.assertSameGraph(load_index(self.indexName, self.sourceName), self.graph)
+        # The new mtime is written in place, and the next load does not hash the file again
+        self.assertEqual(readHeader(self.indexName)['source']['mtime'], stat.st_mtime_ns + 10 ** 9)
+        self.assertEqual(os.path.getsize(self.indexName), size)
+        with mock.patch.object(graph_index, 'fileHash') as fileHash:
+            self.assertSameGraph(load_index(self.indexName, self.sourceName), self.graph)
+        fileHash.assert_not_called()
+
+    def test_restamp_longer_header(self):
+        # A one-digit mtime leaves no room for the real one, so the index is saved again
+        os.utime(self.sourceName, ns=(1, 1))
+        save_index(self.graph, self.indexName, self.sourceName)
+        os.utime(self.sourceName)
+        mtime = os.stat(self.sourceName).st_mtime_ns
+        self.assertSameGraph(load_index(self.indexName, self.sourceName), self.graph)
+        header = readHeader(self.indexName)
+        self.assertEqual(header['source']['mtime'], mtime)
+        with mock.patch.object(graph_index, 'fileHash') as fileHash:
+            graph = load_index(self.indexName, self.sourceName)
+        fileHash.assert_not_called()
+        self.assertSameGraph(graph, self.graph)
+        self.assertTrue(np.array_equal(graph.components.labels, self.graph.components.labels))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import random
+import unittest
+
+import numpy as np
+
+from bacon_number import BaconNumberCalculator
+from landmarks import UNBOUNDED, LandmarkOracle, benchmark, pickLandmarks
+from unittest_cast_graph import DATA, buildGraph, distances, readCasts
+
+
+class TestLandmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.casts = readCasts('Bacon_06.txt')
+        self.graph = buildGraph(self.casts)
+        self.oracle = LandmarkOracle(self.graph, 8)
+        self.rng = random.Random(507)
+
+    def test_pickLandmarks(self):
+        # The summed cast size of every actor's movies, counted the slow way
+        scores = {}
+        for cast in self.casts.values():
+            for actor in cast:
+                scores[actor] = scores.get(actor, 0) + len(cast)
+        picked = [scores[self.graph.names[landmark]] for landmark in pickLandmarks(self.graph, 8)]
+        self.assertEqual(picked, sorted(scores.values(), reverse=True)[:8])
+        self.assertEqual(len(pickLandmarks(self.graph, 10 ** 6)), self.graph.numActors())
+
+    def test_distance(self):
+        self.assertEqual(self.oracle.distance.shape, (8, self.graph.numActors()))
+        for i, landmark in enumerate(self.oracle.landmarks):
+            expected = distances(self.casts, self.graph.names[landmark])
+            for actor in self.rng.sample(self.graph.names, 100):
+                self.assertEqual(self.oracle.distance[i, self.graph.actorId(actor)], expected.get(actor, -1))
+
+    def test_bounds(self):
+        # Every bound contains the true Bacon number, and a tight one comes with a shortest path
+        tight = 0
+        for source in self.rng.sample(self.graph.names, 5) + ['Bacon, Kevin']:
+            expected = distances(self.casts, source)
+            sourceId = self.graph.actorId(source)
+            for target in self.rng.sample(self.graph.names, 300) + [source]:
+                lower, upper, landmark = self.oracle.bounds(sourceId, self.graph.actorId(target))
+                number = expected.get(target, -1)
+                if number == -1:
+                    self.assertIn(upper, (-1, UNBOUNDED))
+                    continue
+                self.assertNotEqual(upper, -1)
+                self.assertLessEqual(lower, number)
+                self.assertGreaterEqual(upper, number)
+                if landmark != -1:
+                    path = self.oracle.path(sourceId, self.graph.actorId(target), landmark)
+                    self.assertEqual(len(path), 2 * upper + 1)
+                    self.assertEqual((path[0], path[-1]), (source, target))
+                if lower == upper:
+                    tight += 1
+        self.assertGreater(tight, 0)
+
+    def test_calculator(self):
+        calculator = BaconNumberCalculator(os.path.join(DATA, 'Bacon_06.txt'))
+        self.assertEqual(calculator.estimateBaconNumber('Bacon, Kevin', 'No Such Actor'), [-1, -1])
+        calculator.buildLandmarks(8)
+        expected = distances(self.casts, 'Bacon, Kevin')
+        for actor in self.rng.sample(sorted(calculator.adjList), 200):
+            lower, upper = calculator.estimateBaconNumber('Bacon, Kevin', actor)
+            number, path = calculator.calcBaconNumber('Bacon, Kevin', actor)
+            self.assertEqual(number, expected.get(actor, -1), actor)
+            if number >= 0:
+                self.assertTrue(lower <= number <= upper, (lower, number, upper))
+                self.assertEqual(len(path), 2 * number + 1)
+                for i in range(1, len(path), 2):
+                    self.assertIn(path[i - 1], self.casts[path[i]])
+                    self.assertIn(path[i + 1], self.casts[path[i]])
+        report = benchmark(calculator, pairs=100)
+        self.assertEqual(report['landmarks'], 8)
+        self.assertTrue(0 <= report['hitRate'] <= 1)
+
+    def test_no_landmarks(self):
+        oracle = LandmarkOracle(self.graph, 0)
+        self.assertEqual(oracle.distance.shape, (0, self.graph.numActors()))
+        self.assertEqual(oracle.bounds(0, 1), (1, UNBOUNDED, -1))
+        self.assertEqual(oracle.bounds(0, 0), (0, UNBOUNDED, -1))
+        self.assertTrue(np.array_equal(oracle.landmarks, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
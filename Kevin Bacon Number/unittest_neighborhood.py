@@ -0,0 +1,115 @@
+import itertools
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import neighborhood
+from bacon_number import BaconNumberCalculator
+from cast_graph import CastGraph, gather
+from neighborhood import kHop, movieFilter
+from unittest_cast_graph import DATA, readCasts
+
+YEARS = '''Old Movie (1990)/A/B
+New Movie (2005)/A/C
+Later Movie (2010)/C/D
+No Year Movie/A/E
+Reunion (2011)/A/C
+'''
+
+
+def year(title):
+    years = re.findall(r'\((\d{4})', title)
+    return int(years[-1]) if years else -1
+
+
+def rings(casts, source, k, allowed=None):
+    """
+    Reference k-hop rings, {actor: (hops, score)}, from plain sets.
+
+    A movie links one ring to the next only the first time it is reached,
+    and an actor's score is the number of such movies they are in.
+    """
+    found = {source: (0, 0)}
+    ring = {source}
+    used = set()
+    for hops in range(1, k + 1):
+        movies = {title for title, cast in casts.items()
+                  if title not in used and cast & ring and (allowed is None or allowed(title))}
+        used |= movies
+        scores = {}
+        for title in movies:
+            for actor in casts[title]:
+                if actor not in found:
+                    scores[actor] = scores.get(actor, 0) + 1
+        for actor, score in scores.items():
+            found[actor] = (hops, score)
+        ring = set(scores)
+    del found[source]
+    return found
+
+
+class TestNeighborhood(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        fileName = os.path.join(self.directory, 'years.txt')
+        with open(fileName, 'w') as f:
+            f.write(YEARS)
+        self.graph = CastGraph.fromFile(fileName)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def kHop(self, source, k, minYear=None, maxYear=None):
+        return [(self.graph.names[actorId], hops, score)
+                for actorId, hops, score in kHop(self.graph, self.graph.actorId(source), k, minYear, maxYear)]
+
+    def test_rings(self):
+        self.assertEqual(self.kHop('A', 1), [('C', 1, 2), ('B', 1, 1), ('E', 1, 1)])
+        self.assertEqual(self.kHop('A', 2), [('C', 1, 2), ('B', 1, 1), ('E', 1, 1), ('D', 2, 1)])
+        self.assertEqual(self.kHop('A', 5), self.kHop('A', 2))
+        self.assertEqual(self.kHop('D', 3), [('C', 1, 1), ('A', 2, 2), ('B', 3, 1), ('E', 3, 1)])
+        self.assertEqual(self.kHop('A', 0), [])
+
+    def test_year_filter(self):
+        self.assertEqual(self.kHop('A', 2, minYear=2000), [('C', 1, 2), ('D', 2, 1)])
+        self.assertEqual(self.kHop('A', 2, maxYear=2005), [('B', 1, 1), ('C', 1, 1)])
+        self.assertEqual(self.kHop('A', 2, minYear=2006, maxYear=2010), [])
+        self.assertEqual(self.kHop('C', 2, minYear=2011), [('A', 1, 1)])
+        # Movies without a year only count when no year is given
+        self.assertIsNone(movieFilter(self.graph))
+        self.assertEqual(movieFilter(self.graph, 1900).tolist(), [True, True, True, False, True])
+        graph = CastGraph.fromIncidence(['A'], ['Crash (2004 I)', 'Crash (2004/II)', 'Footloose (1984)', 'Untitled'],
+                                        [0, 1, 2, 3], [0, 0, 0, 0])
+        self.assertEqual(graph.movieYears().tolist(), [2004, 2004, 1984, -1])
+
+    def test_lazy(self):
+        calls = []
+        with mock.patch.object(neighborhood, 'gather', wraps=lambda *args: calls.append(1) or gather(*args)):
+            first = next(kHop(self.graph, self.graph.actorId('A'), 5))
+        self.assertEqual(self.graph.names[first[0]], 'C')
+        # Only the first ring was expanded
+        self.assertEqual(len(calls), 2)
+
+    def test_calculator(self):
+        casts = readCasts('Bacon_06.txt')
+        calculator = BaconNumberCalculator(os.path.join(DATA, 'Bacon_06.txt'))
+        for minYear in (None, 2006):
+            allowed = None if minYear is None else lambda title: year(title) >= minYear
+            expected = rings(casts, 'Bacon, Kevin', 3, allowed)
+            found = list(calculator.collaborationRadius('Bacon, Kevin', 3, minYear=minYear))
+            self.assertEqual({actor: (hops, score) for actor, hops, score in found}, expected)
+            self.assertEqual(len(found), len(expected))
+            # Nearest rings first, and the highest score first within a ring
+            self.assertEqual([(hops, -score) for _, hops, score in found],
+                             sorted((hops, -score) for _, hops, score in found))
+        self.assertEqual(list(itertools.islice(calculator.collaborationRadius('Bacon, Kevin', 3), 5)),
+                         list(calculator.collaborationRadius('Bacon, Kevin', 3))[:5])
+        self.assertEqual(list(calculator.collaborationRadius('No Such Actor')), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
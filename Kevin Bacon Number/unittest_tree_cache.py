@@ -0,0 +1,97 @@
+import os
+import random
+import unittest
+from unittest import mock
+
+from bacon_number import BaconNumberCalculator
+from tree_cache import TreeCache
+from unittest_cast_graph import DATA, distances, readCasts
+
+
+class TestTreeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calculator = BaconNumberCalculator(os.path.join(DATA, 'mimi_graph.txt'))
+        self.graph = self.calculator.graph
+        self.cache = TreeCache(self.graph, 2)
+        self.a, self.b, self.c = (self.graph.actorId(name) for name in 'ABC')
+
+    def test_hits_and_misses(self):
+        tree = self.cache.get(self.a)
+        self.assertIs(self.cache.get(self.a), tree)
+        self.assertIs(self.cache.cached(self.a), tree)
+        self.assertIsNone(self.cache.cached(self.b))
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 1, 'hitRate': 2 / 3, 'size': 1, 'maxSize': 2})
+        self.assertEqual(tree.path(self.graph.actorId('P'))[0], 'A')
+
+    def test_eviction(self):
+        self.cache.get(self.a)
+        self.cache.get(self.b)
+        self.cache.get(self.a)
+        self.cache.get(self.c)
+        # B was used least recently
+        self.assertEqual(list(self.cache.trees), [self.a, self.c])
+        self.assertNotIn(self.b, self.cache)
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get(self.b)
+        self.assertEqual(self.cache.misses, 4)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_no_cache(self):
+        cache = TreeCache(self.graph, 0)
+        self.assertIsNot(cache.get(self.a), cache.get(self.a))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 2, 0))
+
+
+class TestCalculatorCache(unittest.TestCase):
+
+    def setUp(self):
+        self.casts = readCasts('Bacon_06.txt')
+        self.calculator = BaconNumberCalculator(os.path.join(DATA, 'Bacon_06.txt'), cacheSize=4)
+        self.actors = sorted(self.calculator.adjList)
+        self.rng = random.Random(507)
+
+    def test_repeated_source(self):
+        targets = self.rng.sample(self.actors, 50)
+        with mock.patch.object(self.calculator.graph, 'bfs', wraps=self.calculator.graph.bfs) as bfs:
+            first = [self.calculator.calcBaconNumber('Bacon, Kevin', target) for target in targets]
+            again = [self.calculator.calcBaconNumber('Bacon, Kevin', target) for target in targets]
+        # One search, then every query is answered from the cached tree
+        self.assertEqual(bfs.call_count, 1)
+        self.assertEqual(again, first)
+        self.assertEqual(self.calculator.treeCache.misses, 1)
+        # The graph is undirected, so the tree cached for the end actor answers reversed queries too
+        target = next(target for target, (number, _) in zip(targets, first) if number > 0)
+        number, path = self.calculator.calcBaconNumber(target, 'Bacon, Kevin')
+        self.assertEqual(number, first[targets.index(target)][0])
+        self.assertEqual((path[0], path[-1]), (target, 'Bacon, Kevin'))
+        self.assertEqual(self.calculator.treeCache.misses, 1)
+
+    def test_calcBaconNumbers(self):
+        targets = self.rng.sample(self.actors, 300) + ['Bacon, Kevin', 'No Such Actor']
+        expected = distances(self.casts, 'Bacon, Kevin')
+        with mock.patch.object(self.calculator.graph, 'bfs', wraps=self.calculator.graph.bfs) as bfs:
+            results = self.calculator.calcBaconNumbers('Bacon, Kevin', targets)
+        self.assertEqual(bfs.call_count, 1)
+        self.assertEqual(len(results), len(targets))
+        for target, (number, path) in zip(targets, results):
+            self.assertEqual(number, expected.get(target, -1), target)
+            self.assertEqual(number, self.calculator.calcBaconNumber('Bacon, Kevin', target)[0])
+            if number > 0:
+                self.assertEqual(len(path), 2 * number + 1)
+                self.assertEqual((path[0], path[-1]), ('Bacon, Kevin', target))
+                for i in range(1, len(path), 2):
+                    self.assertIn(path[i - 1], self.casts[path[i]])
+                    self.assertIn(path[i + 1], self.casts[path[i]])
+        self.assertEqual(results[-2], [0, ['Bacon, Kevin']])
+        self.assertEqual(self.calculator.calcBaconNumbers('No Such Actor', targets[:3]), [[-1, []]] * 3)
+
+    def test_calcBaconNumbers_mimi(self):
+        calculator = BaconNumberCalculator(os.path.join(DATA, 'mimi_graph.txt'))
+        self.assertEqual(calculator.calcBaconNumbers('G', ['G', 'P', 'No Such Actor']),
+                         [[0, ['G']], [1, ['G', 'Movie3', 'P']], [-1, []]])
+
+
+if __name__ == "__main__":
+    unittest.main()
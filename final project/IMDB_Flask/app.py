@@ -1,14 +1,25 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, g
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, g
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, timezone
 import pandas as pd
+import itertools
 import json
-import random
+import os
+import sqlite3
+import threading
+from search_index import SearchIndex
+import time
+import uuid
 global graph
 
 app = Flask(__name__)
 # app.use_reloader = True
 app.secret_key = '55344663'
+# 由 create_db.py 生成的数据库
+app.config['DATABASE'] = os.path.join(app.root_path, 'movies.db')
+# upsert_db.py 写入数据库的同时把变化追加到这个文件, 运行中的应用据此更新图
+app.config['CHANGE_LOG'] = os.path.join(app.root_path, 'changes.jsonl')
 
 # db = SQLAlchemy(app)
 
@@ -67,7 +78,11 @@ class Movies:
         self.directors = []
 
     def to_dict(self):
-        return vars(self)
+        """演员和导演只保留 id 和姓名, 结果可以直接转成 JSON"""
+        data = dict(vars(self))
+        data['actors'] = [{'id': actor.id, 'name': actor.name} for actor in self.actors]
+        data['directors'] = [{'id': director.id, 'name': director.name} for director in self.directors]
+        return data
 
 class Actors:
     def __init__(self, id, name, actor):
@@ -88,28 +103,196 @@ class Directors:
     def to_dict(self):
         return vars(self)
 
+class IdAllocator:
+    """单调递增, 线程安全的 id 分配器"""
+    def __init__(self, start=1):
+        self._next = start
+        self._lock = threading.Lock()
+
+    def allocate(self):
+        with self._lock:
+            value = self._next
+            self._next += 1
+            return value
+
+
+# 每种节点有自己的 id 空间; 图里的节点 id 为 key * 3 + 类型偏移, 互不冲突且没有上限
+ID_SPACES = {Movies: 0, Actors: 1, Directors: 2}
+# 网页表单新增的节点不写入 movies.db, 它们的 key 从这里开始分配, 避开 upsert_db.py 按 MAX(id) + 1 分配的主键
+LOCAL_KEY_START = 10 ** 9
+KINDS = {Movies: 'movie', Actors: 'actor', Directors: 'director'}
+
+def node_id(kind, key):
+    """某类型第 key 个 id 对应的节点 id"""
+    return key * len(ID_SPACES) + ID_SPACES[kind]
+
+
+def node_key(node):
+    """索引节点用的名字: 电影用片名, 演员和导演用姓名"""
+    return node.title if isinstance(node, Movies) else node.name
+
+
+NO_NEIGHBORS = frozenset()
+
+
 class Graph:
     def __init__(self):
         self.nodes = {}
-        self.edges = {}
+        # 边用集合存储, 重复的边在写入时就被忽略
+        self.edges = {}      # node id -> 指向的节点 id
+        self.reverse = {}    # node id -> 指向它的节点 id
+        self.adjacency = {}  # node id -> {节点类型: 指向的该类型节点 id}
+        # 按类型分区的节点, 以及 名字/片名 -> id 的索引
+        self.registry = {Movies: {}, Actors: {}, Directors: {}}
+        self.names = {Movies: {}, Actors: {}, Directors: {}}
+        self.allocators = {kind: IdAllocator(LOCAL_KEY_START) for kind in ID_SPACES}
+        # 片名, 类型和人名的搜索索引, 电影也可以按演员和导演的名字搜到
+        self.search = SearchIndex()
+        # 人物之间的合作次数 (共同参与的电影数): person id -> Counter(person id -> 次数)
+        # 在 build_collaborators 之前为 None, 之后由 add_edge 增量维护
+        self.collaborators = None
+        # 每次修改都会增加版本号, 用于缓存失效和 ETag
+        self.version = 0
+        self.modified = datetime.now(timezone.utc)
+
+    def touch(self):
+        """记录一次修改"""
+        self.version += 1
+        self.modified = datetime.now(timezone.utc)
 
     def add_node(self, node):
         """添加一个新节点"""
         if node.id not in self.nodes:
             self.nodes[node.id] = node
-            self.edges[node.id] = []
+            self.edges.setdefault(node.id, set())
+            self.reverse.setdefault(node.id, set())
+            self.adjacency.setdefault(node.id, {})
+            self.registry[type(node)][node.id] = node
+            # 重名时保留第一个
+            self.names[type(node)].setdefault(node_key(node), node.id)
+            self.search.add(node.id, KINDS[type(node)], node_key(node), getattr(node, 'genre', None))
+            self.touch()
+
+    def new_id(self, kind):
+        """分配一个新的节点 id"""
+        return node_id(kind, self.allocators[kind].allocate())
+
+    def nodes_of(self, kind):
+        """某一类型的全部节点"""
+        return self.registry[kind].values()
+
+    def find(self, kind, name):
+        """按名字 (电影按片名) 查找节点, 找不到返回 None"""
+        node_id = self.names[kind].get(name)
+        return None if node_id is None else self.nodes[node_id]
 
     def add_edge(self, from_node_id, to_node_id):
         """为节点添加一条边，指向另一个节点"""
-        if from_node_id in self.edges:
-            self.edges[from_node_id].append(to_node_id)
-            
+        if self.link(from_node_id, to_node_id):
+            self.touch()
+
+    def add_edges(self, pairs):
+        """批量添加边, pairs 是 (from_node_id, to_node_id) 的可迭代对象; 返回新增的边数"""
+        added = sum(self.link(from_node_id, to_node_id) for from_node_id, to_node_id in pairs)
+        if added:
+            self.touch()
+        return added
+
+    def link(self, from_node_id, to_node_id):
+        """添加一条边但不记录修改, 边已存在时返回 False"""
+        if from_node_id not in self.edges or to_node_id in self.edges[from_node_id]:
+            return False
         if to_node_id not in self.edges:  # Ensure to_node has an entry in edges
-            self.edges[to_node_id] = []
-            
+            self.edges[to_node_id] = set()
+            self.reverse[to_node_id] = set()
+            self.adjacency[to_node_id] = {}
+        if self.collaborators is not None:
+            self.add_collaboration(from_node_id, to_node_id)
+        source = self.nodes.get(from_node_id)
+        target = self.nodes.get(to_node_id)
+        self.edges[from_node_id].add(to_node_id)
+        self.reverse[to_node_id].add(from_node_id)
+        self.adjacency[from_node_id].setdefault(type(target), set()).add(to_node_id)
+        if isinstance(source, Movies) and isinstance(target, (Actors, Directors)):
+            self.search.extend(from_node_id, target.name)
+        return True
+
+    def remove_edges(self, pairs):
+        """批量删除边; 返回删除的边数"""
+        removed = sum(self.unlink(from_node_id, to_node_id) for from_node_id, to_node_id in pairs)
+        if removed:
+            self.touch()
+        return removed
+
+    def unlink(self, from_node_id, to_node_id):
+        """删除一条边但不记录修改, 边不存在时返回 False"""
+        if to_node_id not in self.edges.get(from_node_id, NO_NEIGHBORS):
+            return False
+        self.edges[from_node_id].discard(to_node_id)
+        self.reverse[to_node_id].discard(from_node_id)
+        self.adjacency[from_node_id].get(type(self.nodes.get(to_node_id)), set()).discard(to_node_id)
+        if self.collaborators is not None:
+            self.remove_collaboration(from_node_id, to_node_id)
+        return True
+
+    def reindex(self, node):
+        """节点的字段或演职人员变化后重建它的搜索索引"""
+        self.search.remove(node.id)
+        self.search.add(node.id, KINDS[type(node)], node_key(node), getattr(node, 'genre', None))
+        if isinstance(node, Movies):
+            self.search.extend(node.id, *(self.nodes[person_id].name for person_id in self.people_of(node.id)))
+
+    def neighbors(self, node_id, kind):
+        """某节点指向的某一类型的节点 id"""
+        return self.adjacency.get(node_id, {}).get(kind, NO_NEIGHBORS)
+
+    def people_of(self, movie_id):
+        """电影的演员和导演的 id"""
+        return self.neighbors(movie_id, Actors) | self.neighbors(movie_id, Directors)
+
+    def is_person(self, node_id):
+        return isinstance(self.nodes.get(node_id), (Actors, Directors))
+
+    def build_collaborators(self):
+        """
+        一次计算全部合作次数: 把 (电影, 人物) 表与自身按电影连接, 再按人物对计数.
+        """
+        credits = pd.DataFrame(
+            [(movie_id, person_id) for movie_id in self.registry[Movies] for person_id in self.people_of(movie_id)],
+            columns=['movie', 'person'])
+        pairs = credits.merge(credits, on='movie')
+        counts = pairs[pairs['person_x'] != pairs['person_y']].groupby(['person_x', 'person_y']).size()
+        self.collaborators = {}
+        for (person_id, other_id), count in counts.items():
+            self.collaborators.setdefault(int(person_id), Counter())[int(other_id)] = int(count)
+
+    def add_collaboration(self, movie_id, person_id):
+        """新的 电影 -> 人物 边: 这个人和电影里的其他人物合作次数各加一"""
+        if not isinstance(self.nodes.get(movie_id), Movies) or not self.is_person(person_id):
+            return
+        for other_id in self.people_of(movie_id):
+            if other_id != person_id:
+                self.collaborators.setdefault(person_id, Counter())[other_id] += 1
+                self.collaborators.setdefault(other_id, Counter())[person_id] += 1
+
+    def remove_collaboration(self, movie_id, person_id):
+        """删除的 电影 -> 人物 边: 这个人和电影里的其他人物合作次数各减一"""
+        if not isinstance(self.nodes.get(movie_id), Movies) or not self.is_person(person_id):
+            return
+        for other_id in self.people_of(movie_id):
+            if other_id != person_id:
+                for a, b in ((person_id, other_id), (other_id, person_id)):
+                    counts = self.collaborators.get(a)
+                    if counts is not None and counts[b] > 0:
+                        counts[b] -= 1
+                        if counts[b] == 0:
+                            del counts[b]
+
     def to_json(self):
         """将图结构转换为 JSON 格式"""
-        return json.dumps({"nodes": self.nodes, "edges": self.edges}, indent=4)
+        nodes = {node_id: node.to_dict() for node_id, node in self.nodes.items()}
+        edges = {node_id: sorted(targets) for node_id, targets in self.edges.items()}
+        return json.dumps({"nodes": nodes, "edges": edges}, indent=4)
     
 def build_graph():
     with app.app_context():
@@ -118,7 +301,6 @@ def build_graph():
         movies = []
         actors = []
         directors = []
-        movie_ids = []
         for i, row in data.iterrows():
             if not pd.notna(row['Movie_title']):
                 continue
@@ -147,30 +329,18 @@ def build_graph():
                 gross_earnings = None
             
             
-            movie_id = random.randint(1000, 9999)
-            while movie_id in movie_ids:
-                movie_id = random.randint(1000, 9999)
-            movie_ids.append(movie_id)
-            movie = Movies(movie_id, row['Movie_title'], release_date, average_rating, genre, duration, gross_earnings, row['Images'])
+            movie = Movies(graph.new_id(Movies), row['Movie_title'], release_date, average_rating, genre, duration, gross_earnings, row['Images'])
             movies.append(movie)
             
             director_names = row['Director'].split(', ')
             for name in director_names:
-                director_id = random.randint(1000, 9999)
-                while director_id in movie_ids:
-                    director_id = random.randint(1000, 9999)
-                movie_ids.append(director_id)
-                director = Directors(director_id, name, True)
+                director = Directors(graph.new_id(Directors), name, True)
                 directors.append(director)
                 movie.directors.append(director)
                 
             actors_list = eval(row['Actors'])
             for name in actors_list:
-                actor_id = random.randint(1000, 9999)
-                while actor_id in movie_ids:
-                    actor_id = random.randint(1000, 9999)
-                movie_ids.append(actor_id)
-                actor = Actors(actor_id, name, True)
+                actor = Actors(graph.new_id(Actors), name, True)
                 actors.append(actor)
                 movie.actors.append(actor)
 
@@ -185,74 +355,278 @@ def build_graph():
 
         # 假设电影、演员和导演之间的关系也是从数据库中获取
         for movie in movies:
-            for actor in movie.actors:
-                graph.add_edge(movie.id, actor.id)
-                graph.add_edge(actor.id, movie.id)
-            for director in movie.directors:
-                graph.add_edge(movie.id, director.id)
-                graph.add_edge(director.id, movie.id)
+            for person in movie.actors + movie.directors:
+                graph.add_edges([(movie.id, person.id), (person.id, movie.id)])
 
+        graph.build_collaborators()
     return graph
 
 
+def build_graph_from_db(database):
+    """
+    从 movies.db 构建图, 只用三个集合查询: 电影, 人物 (演员和导演), 关联表.
+    """
+    connection = sqlite3.connect(database)
+    try:
+        movies = connection.execute(
+            'SELECT id, title, release_date, average_rating, genre, duration, gross_earnings, image FROM movie'
+        ).fetchall()
+        people = connection.execute(
+            "SELECT 'actor', id, name FROM actor UNION ALL SELECT 'director', id, name FROM director"
+        ).fetchall()
+        links = connection.execute(
+            "SELECT 'actor', movie_id, actor_id FROM movie_actors "
+            "UNION ALL SELECT 'director', movie_id, director_id FROM movie_directors"
+        ).fetchall()
+    finally:
+        connection.close()
+
+    # 节点 id 由数据库主键得到, 重启后不变; 表单新增的节点在 LOCAL_KEY_START 之后, 不会与之冲突
+    graph = Graph()
+    kinds = {'actor': Actors, 'director': Directors}
+    for key, title, release_date, average_rating, genre, duration, gross_earnings, image in movies:
+        release_date = datetime.fromisoformat(release_date) if release_date else datetime.now()
+        graph.add_node(Movies(node_id(Movies, key), title, release_date, average_rating, genre, duration,
+                              gross_earnings, image))
+    for kind, key, name in people:
+        graph.add_node(kinds[kind](node_id(kinds[kind], key), name, True))
+    credits = dict.fromkeys((node_id(Movies, movie_key), node_id(kinds[kind], person_key))
+                            for kind, movie_key, person_key in links)
+    for movie_id, person_id in credits:
+        movie = graph.nodes[movie_id]
+        person = graph.nodes[person_id]
+        if isinstance(person, Actors):
+            movie.actors.append(person)
+        else:
+            movie.directors.append(person)
+    graph.add_edges(credits)
+    graph.add_edges((person_id, movie_id) for movie_id, person_id in credits)
+    graph.build_collaborators()
+    return graph
+
+
+# 已渲染的列表页: (endpoint, page, per_page) -> html, 只对 fragment_version 版本的图有效
+fragment_cache = {}
+fragment_version = None
+
 
-@app.before_first_request
 def load_graph():
+    """启动时加载图, 并记录耗时"""
+    global graph, fragment_version
     print("Loading graph...")
-    global graph
-    graph = build_graph()
+    start = time.perf_counter()
+    if os.path.exists(app.config['DATABASE']):
+        graph = build_graph_from_db(app.config['DATABASE'])
+    else:
+        graph = build_graph()
+    app.config['GRAPH_LOAD_SECONDS'] = time.perf_counter() - start
+    # 每次加载的图版本号都从头开始, 所以 ETag 里要带上这次加载的标识, 旧的缓存页也要丢掉
+    app.config['GRAPH_LOAD_TOKEN'] = uuid.uuid4().hex[:12]
+    fragment_cache.clear()
+    fragment_version = None
+    # 数据库里已经包含了到现在为止的全部变化
+    global change_log_offset, change_log_tail_bytes, change_log_stamp
+    change_log_offset, change_log_tail_bytes, change_log_stamp = 0, b'', None
+    if os.path.exists(app.config['CHANGE_LOG']):
+        with open(app.config['CHANGE_LOG'], 'rb') as f:
+            stat = os.fstat(f.fileno())
+            change_log_offset = stat.st_size
+            change_log_tail_bytes = change_log_tail(f, change_log_offset)
+            change_log_stamp = (stat.st_size, stat.st_mtime_ns)
+    print(f"Loaded {len(graph.nodes)} nodes in {app.config['GRAPH_LOAD_SECONDS']:.3f}s")
+
+
+# 已应用到的位置, 它之前的几个字节, 以及当时日志的 (大小, 修改时间)
+CHANGE_LOG_TAIL = 64
+change_log_offset = 0
+change_log_tail_bytes = b''
+change_log_stamp = None
+change_log_lock = threading.Lock()
+
+
+def apply_change(change):
+    """
+    把变化日志里的一条记录应用到图上: 新增电影, 或者更新电影的字段和演职人员.
+    id 与数据库主键一致, 所以重复应用同一条记录不会产生重复节点.
+    """
+    data = change['movie']
+    movie_id = node_id(Movies, data['id'])
+    release_date = datetime(data['year'], 1, 1) if data['year'] else datetime.now()
+    movie = graph.registry[Movies].get(movie_id)
+    if movie is None:
+        movie = Movies(movie_id, data['title'], release_date, data['average_rating'], data['genre'],
+                       data['duration'], data['gross_earnings'], data['image'])
+        graph.add_node(movie)
+    else:
+        movie.release_date = release_date.strftime("%Y-%m-%d")
+        for field in ('average_rating', 'genre', 'duration', 'gross_earnings', 'image'):
+            setattr(movie, field, data[field])
+
+    wanted = set()
+    for field, kind in (('actors', Actors), ('directors', Directors)):
+        for person_data in data[field]:
+            person_id = node_id(kind, person_data['id'])
+            person = graph.registry[kind].get(person_id)
+            if person is None:
+                person = kind(person_id, person_data['name'], True)
+                graph.add_node(person)
+            wanted.add(person_id)
+            link(movie, person)
+    for person_id in graph.people_of(movie_id) - wanted:
+        unlink(movie, graph.nodes[person_id])
+    graph.reindex(movie)
+    graph.touch()
+
+
+def change_log_tail(f, offset):
+    """offset 之前的最后 CHANGE_LOG_TAIL 个字节, 用来发现日志被截断或替换"""
+    start = max(offset - CHANGE_LOG_TAIL, 0)
+    f.seek(start)
+    return f.read(offset - start)
+
+
+@app.before_request
+def apply_change_log():
+    """每个请求前检查变化日志, 只应用上次之后追加的完整行"""
+    global change_log_offset, change_log_tail_bytes, change_log_stamp
+    path = app.config['CHANGE_LOG']
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    if (stat.st_size, stat.st_mtime_ns) == change_log_stamp:
+        return
+    with change_log_lock:
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return
+        with f:
+            # 在锁内重新检查: 锁外读到的状态可能已经落后于其他线程
+            stat = os.fstat(f.fileno())
+            if change_log_tail(f, change_log_offset) != change_log_tail_bytes:
+                # 日志被截断或替换: 从头应用, 记录可以重复应用
+                change_log_offset = 0
+            f.seek(change_log_offset)
+            chunk = f.read(stat.st_size - change_log_offset)
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].splitlines():
+                if line.strip():
+                    apply_change(json.loads(line))
+            change_log_offset += end
+            change_log_tail_bytes = change_log_tail(f, change_log_offset)
+            change_log_stamp = (stat.st_size, stat.st_mtime_ns) if end == len(chunk) else None
+
+load_graph()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+
+def page_args():
+    """从 ?page=&per_page= 读取分页参数"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', PER_PAGE, type=int), 1), MAX_PER_PAGE)
+    return page, per_page
+
+
+def movies_of(person_id):
+    """某个演员或导演的电影, 按上映日期排序"""
+    movies = [graph.nodes[movie_id] for movie_id in graph.neighbors(person_id, Movies)]
+    return sorted(movies, key=lambda movie: (movie.release_date, movie.title))
+
+
+def render_listing(endpoint, kind, template, name, with_movies):
+    """
+    渲染一页列表. 页面按图的版本缓存, 响应带 ETag 和 Last-Modified,
+    浏览器和代理可以用 If-None-Match / If-Modified-Since 重新验证.
+    """
+    global fragment_version
+    page, per_page = page_args()
+    etag = f"{endpoint}-{app.config['GRAPH_LOAD_TOKEN']}-{graph.version}-{page}-{per_page}"
+    if request.if_none_match.contains(etag):
+        response = app.make_response(('', 304))
+    else:
+        if fragment_version != graph.version:
+            fragment_cache.clear()
+            fragment_version = graph.version
+        key = (endpoint, page, per_page)
+        html = fragment_cache.get(key)
+        if html is None:
+            nodes = graph.nodes_of(kind)
+            pages = max((len(nodes) + per_page - 1) // per_page, 1)
+            items = [node.to_dict() for node in itertools.islice(nodes, (page - 1) * per_page, page * per_page)]
+            if with_movies:
+                items = [dict(item, movies=movies_of(item['id'])) for item in items]
+            html = render_template(template, page=page, pages=pages, per_page=per_page, **{name: items})
+            fragment_cache[key] = html
+        response = app.make_response(html)
+    response.set_etag(etag)
+    response.last_modified = graph.modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route('/movies')
 def movies():
-    movies_list = [graph.nodes[node_id].to_dict() for node_id in graph.nodes if isinstance(graph.nodes[node_id], Movies)]
-    return render_template('movies.html', movies=movies_list)
+    return render_listing('movies', Movies, 'movies.html', 'movies', with_movies=False)
 
 @app.route('/actors')
 def actors():
     # Access the graph to get actors and their movies
-    actors_list = [graph.nodes[node_id].to_dict() for node_id in graph.nodes if isinstance(graph.nodes[node_id], Actors)]
-    # Process each actor to ensure unique movies
-    for actor in actors_list:
-        seen = set()
-        unique_movies = []
-        for movie_id in graph.edges[actor['id']]:  # Assuming edges store movie connections
-            movie = graph.nodes[movie_id]
-            if movie.title not in seen:
-                seen.add(movie.title)
-                unique_movies.append(movie)
-        actor['movies'] = unique_movies  # Assuming each actor dict can store its movies directly
-    return render_template('actors.html', actors=actors_list)
+    return render_listing('actors', Actors, 'actors.html', 'actors', with_movies=True)
 
 @app.route('/directors')
 def directors():
     # Access the graph to get directors and their movies
-    directors_list = [graph.nodes[node_id].to_dict() for node_id in graph.nodes if isinstance(graph.nodes[node_id], Directors)]
-    # Process each director to ensure unique movies
-    for director in directors_list:
-        seen = set()
-        unique_movies = []
-        for movie_id in graph.edges[director['id']]:  # Assuming edges store movie connections
-            movie = graph.nodes[movie_id]
-            if movie.title not in seen:
-                seen.add(movie.title)
-                unique_movies.append(movie)
-        director['movies'] = unique_movies  # Assuming each actor dict can store its movies directly
-
-    return render_template('directors.html', directors=directors_list)
+    return render_listing('directors', Directors, 'directors.html', 'directors', with_movies=True)
 
 @app.route('/movie/<int:movie_id>')
 def movie_details(movie_id):
     # Fetch the movie details from the graph
-    movie = graph.nodes.get(movie_id, None)
+    movie = graph.registry[Movies].get(movie_id, None)
     if movie is None:
         return render_template('404.html'), 404  # Assuming there's a 404 error page
     # Render the movie details page
     return render_template('movie_details.html', movie=movie.to_dict())
 
+
+def find_or_add_person(kind, name):
+    """按姓名查找演员或导演, 没有则新建"""
+    person = graph.find(kind, name)
+    if person is None:
+        person = kind(graph.new_id(kind), name, True)
+        graph.add_node(person)
+    return person
+
+def find_or_add_movie(title):
+    """按片名查找电影, 没有则新建一个只有片名的电影"""
+    movie = graph.find(Movies, title)
+    if movie is None:
+        movie = Movies(graph.new_id(Movies), title, datetime.now(), None, None, None, None, None)
+        graph.add_node(movie)
+    return movie
+
+def link(movie, person):
+    """把演员或导演加入电影, 并添加双向边"""
+    if person.id in graph.edges[movie.id]:
+        return
+    if isinstance(person, Actors):
+        movie.actors.append(person)
+    else:
+        movie.directors.append(person)
+    graph.add_edges([(movie.id, person.id), (person.id, movie.id)])
+
+def unlink(movie, person):
+    """把演员或导演移出电影, 并删除双向边"""
+    people = movie.actors if isinstance(person, Actors) else movie.directors
+    people[:] = [other for other in people if other.id != person.id]
+    graph.remove_edges([(movie.id, person.id), (person.id, movie.id)])
+
 @app.route('/add_movie', methods=['GET', 'POST'])
 def add_movie():
     if request.method == 'POST':
@@ -263,60 +637,25 @@ def add_movie():
         duration = request.form['duration']
         gross_earnings = request.form['gross_earnings']
         image_url = request.form['image_url']
-        actor_names = [name.strip() for name in request.form['actors'].split(',')]
-        director_names = [name.strip() for name in request.form['directors'].split(',')]
-        movie_id = random.randint(1000, 9999)
-        while movie_id in graph.nodes:
-            movie_id = random.randint(1000, 9999)
+        actor_names = [name.strip() for name in request.form['actors'].split(',') if name.strip()]
+        director_names = [name.strip() for name in request.form['directors'].split(',') if name.strip()]
         
         average_rating = request.form['average_rating']
         if average_rating:
             average_rating = float(average_rating)
         else:
             average_rating = None
-        movie = Movies(movie_id, title=title, release_date=release_date, average_rating=average_rating, genre=genre,
-                      duration=duration, gross_earnings=gross_earnings, image=image_url)
+        movie = Movies(graph.new_id(Movies), title=title, release_date=release_date, average_rating=average_rating,
+                       genre=genre, duration=duration, gross_earnings=gross_earnings, image=image_url)
+        # 先加入节点, 否则电影一侧的边会丢失
+        graph.add_node(movie)
 
         for name in actor_names:
-            for node_id in graph.nodes:
-                if isinstance(graph.nodes[node_id], Actors) and graph.nodes[node_id].name == name:
-                    actor = graph.nodes[node_id]
-                    movie.actors.append(actor)
-                    graph.add_edge(movie.id, actor.id)
-                    graph.add_edge(actor.id, movie.id)
-                    break
-                elif isinstance(graph.nodes[node_id], Actors) and graph.nodes[node_id].name != name:
-                    actor_id = random.randint(1000, 9999)
-                    while actor_id in graph.nodes:
-                        actor_id = random.randint(1000, 9999)
-                    actor = Actors(actor_id, name, True)
-                    graph.add_node(actor)
-                    movie.actors.append(actor)
-                    graph.add_edge(movie.id, actor.id)
-                    graph.add_edge(actor.id, movie.id)
-                    break
-    
+            link(movie, find_or_add_person(Actors, name))
 
         for name in director_names:
-            for node_id in graph.nodes:
-                if isinstance(graph.nodes[node_id], Directors) and graph.nodes[node_id].name == name:
-                    director = graph.nodes[node_id]
-                    movie.directors.append(director)
-                    graph.add_edge(movie.id, director.id)
-                    graph.add_edge(director.id, movie.id)
-                    break
-                elif isinstance(graph.nodes[node_id], Directors) and graph.nodes[node_id].name != name:
-                    director_id = random.randint(1000, 9999)
-                    while director_id in graph.nodes:
-                        director_id = random.randint(1000, 9999)
-                    director = Directors(director_id, name, True)
-                    graph.add_node(director)
-                    movie.directors.append(director)
-                    graph.add_edge(movie.id, director.id)
-                    graph.add_edge(director.id, movie.id)
-                    break
+            link(movie, find_or_add_person(Directors, name))
 
-        graph.add_node(movie)
         return redirect(url_for('movies'))
 
     return render_template('add_movie.html')
@@ -327,29 +666,10 @@ def add_actor():
         name = request.form['name']
         movies_input = request.form['movies']
         movie_titles = [title.strip() for title in movies_input.split(',') if title.strip()]
-        actor_id = random.randint(1000, 9999)
-        while actor_id in graph.nodes:
-            actor_id = random.randint(1000, 9999)
-        actor = Actors(actor_id, name, True)
+        actor = Actors(graph.new_id(Actors), name, True)
         graph.add_node(actor)
         for title in movie_titles:
-            for node_id in graph.nodes:
-                if isinstance(graph.nodes[node_id], Movies) and graph.nodes[node_id].title == title:
-                    movie = graph.nodes[node_id]
-                    movie.actors.append(actor)
-                    graph.add_edge(movie.id, actor.id)
-                    graph.add_edge(actor.id, movie.id)
-                    break
-                elif isinstance(graph.nodes[node_id], Movies) and graph.nodes[node_id].title != title:
-                    movie_id = random.randint(1000, 9999)
-                    while movie_id in graph.nodes:
-                        movie_id = random.randint(1000, 9999)
-                    movie = Movies(movie_id, title, datetime.now(), None, None, None, None, None)
-                    graph.add_node(movie)
-                    movie.actors.append(actor)
-                    graph.add_edge(movie.id, actor.id)
-                    graph.add_edge(actor.id, movie.id)
-                    break
+            link(find_or_add_movie(title), actor)
         
         return redirect(url_for('actors'))
     
@@ -363,38 +683,104 @@ def add_director():
         movies_input = request.form['movies']
         movie_titles = [title.strip() for title in movies_input.split(',') if title.strip()]
         for title in movie_titles:
-            for node_id in graph.nodes:
-                if isinstance(graph.nodes[node_id], Movies) and graph.nodes[node_id].title == title:
-                    movie = graph.nodes[node_id]
-                    break
-                elif isinstance(graph.nodes[node_id], Movies) and graph.nodes[node_id].title != title:
-                    movie_id = random.randint(1000, 9999)
-                    while movie_id in graph.nodes:
-                        movie_id = random.randint(1000, 9999)
-                    movie = Movies(movie_id, title, datetime.now(), None, None, None, None)
-                    graph.add_node(movie)
-                    break
-            for node_id in graph.nodes:
-                if isinstance(graph.nodes[node_id], Directors) and graph.nodes[node_id].name == name:
-                    director = graph.nodes[node_id]
-                    movie.directors.append(director)
-                    graph.add_edge(movie.id, director.id)
-                    graph.add_edge(director.id, movie.id)
-                    break
-                elif isinstance(graph.nodes[node_id], Directors) and graph.nodes[node_id].name != name:
-                    director_id = random.randint(1000, 9999)
-                    while director_id in graph.nodes:
-                        director_id = random.randint(1000, 9999)
-                    director = Directors(director_id, name, True)
-                    graph.add_node(director)
-                    movie.directors.append(director)
-                    graph.add_edge(movie.id, director.id)
-                    graph.add_edge(director.id, movie.id)
-                    break
+            link(find_or_add_movie(title), find_or_add_person(Directors, name))
         return redirect(url_for('directors'))
     return render_template('add_director.html')
 
 
+def find_person(person_id):
+    """按 id 查找演员或导演"""
+    return graph.registry[Actors].get(person_id) or graph.registry[Directors].get(person_id)
+
+
+# JSON API: 列表以 NDJSON (每行一个 JSON 对象) 流式返回, 服务器内存不随数据量增长
+NDJSON_CHUNK = 256
+
+
+def ndjson(records):
+    """把记录编码成 NDJSON, 每 NDJSON_CHUNK 行输出一块"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record))
+        if len(lines) == NDJSON_CHUNK:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def node_records(kind):
+    # 只复制 id 列表, 流式输出时图被修改也不会出错
+    registry = graph.registry[kind]
+    for node_id in list(registry):
+        node = registry.get(node_id)
+        if node is not None:
+            yield dict(node.to_dict(), kind=KINDS[kind])
+
+
+def graph_records():
+    for kind in KINDS:
+        yield from node_records(kind)
+    for node_id in list(graph.edges):
+        yield {'kind': 'edge', 'source': node_id, 'targets': list(graph.edges.get(node_id, ()))}
+
+
+@app.route('/api/movies')
+def api_movies():
+    return Response(ndjson(node_records(Movies)), mimetype='application/x-ndjson')
+
+@app.route('/api/people/<int:person_id>')
+def api_person(person_id):
+    person = find_person(person_id)
+    if person is None:
+        return jsonify({'error': 'person not found'}), 404
+    data = dict(person.to_dict(), kind=KINDS[type(person)])
+    data['movies'] = [{'id': movie.id, 'title': movie.title} for movie in movies_of(person_id)]
+    return jsonify(data)
+
+@app.route('/api/graph')
+def api_graph():
+    return Response(ndjson(graph_records()), mimetype='application/x-ndjson')
+
+
+@app.route('/person/<int:person_id>/collaborators')
+def collaborators(person_id):
+    """
+    和某人合作过的人物, 按合作次数排序; ?kind=actor 或 ?kind=director 只看一类,
+    例如 "哪些演员和导演 X 合作过".
+    """
+    person = find_person(person_id)
+    if person is None:
+        return jsonify({'error': 'person not found'}), 404
+    kind = request.args.get('kind')
+    result = []
+    for other_id, count in graph.collaborators.get(person_id, Counter()).most_common():
+        other = graph.nodes[other_id]
+        if kind is None or KINDS[type(other)] == kind:
+            result.append({'id': other_id, 'kind': KINDS[type(other)], 'name': other.name, 'movies': count})
+    return jsonify({'id': person_id, 'kind': KINDS[type(person)], 'name': person.name, 'collaborators': result})
+
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def search_limit():
+    return min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+
+@app.route('/search')
+def search():
+    """全文搜索片名, 类型, 演员和导演: /search?q=tom"""
+    query = request.args.get('q', '')
+    return jsonify({'query': query, 'results': graph.search.search(query, search_limit())})
+
+@app.route('/search/suggest')
+def search_suggest():
+    """自动补全: 名字以 q 开头的电影, 演员和导演"""
+    query = request.args.get('q', '')
+    return jsonify({'query': query, 'results': graph.search.suggest(query, search_limit())})
+
+
 if __name__ == '__main__':
     app.run(debug=True)
 
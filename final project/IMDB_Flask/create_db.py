@@ -1,6 +1,7 @@
 # %%
+import ast
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import create_engine, func, select, Column, Integer, String, Float, DateTime, ForeignKey, Table, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import PrimaryKeyConstraint
 from sqlalchemy.orm import relationship, sessionmaker
@@ -19,14 +20,17 @@ movie_directors = Table('movie_directors', Base.metadata,
                         Column('movie_id', Integer, ForeignKey('movie.id')),
                         Column('director_id', Integer, ForeignKey('director.id')))
 
+# How many movies each director made with each actor, filled in by bulk_import
 director_actors = Table('director_actors', Base.metadata,
-                        )
+                        Column('director_id', Integer, ForeignKey('director.id'), primary_key=True),
+                        Column('actor_id', Integer, ForeignKey('actor.id'), primary_key=True),
+                        Column('movies', Integer, nullable=False))
 
 # Define models
 class Movie(Base):
     __tablename__ = 'movie'
     id = Column(Integer, primary_key=True)
-    title = Column(String, nullable=False)
+    title = Column(String, nullable=False, index=True)
     release_date = Column(DateTime)
     average_rating = Column(Float)
     genre = Column(String)
@@ -41,7 +45,7 @@ class Movie(Base):
 class Actor(Base):
     __tablename__ = 'actor'
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     actor = Column(Boolean, default=True)
     movies = relationship('Movie', secondary=movie_actors, back_populates='actors')
     
@@ -50,7 +54,7 @@ class Actor(Base):
 class Director(Base):
     __tablename__ = 'director'
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     director = Column(Boolean, default=True)
     movies = relationship('Movie', secondary=movie_directors, back_populates='directors')
     PrimaryKeyConstraint('id')
@@ -60,68 +64,114 @@ class Director(Base):
 # Database setup
 engine = create_engine('sqlite:///movies.db')  # Replace with your actual database URI
 Base.metadata.create_all(engine)
+# create_all skips tables that already exist, so add indexes declared after they were created
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
 Session = sessionmaker(bind=engine)
 session = Session()
 
+# %%
+def parse_names(value):
+    """Parses a list cell such as "['Orson Welles', 'Joseph Cotten']" without eval."""
+    try:
+        names = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        names = value.split(', ')
+    return [name.strip() for name in names if name.strip()]
+
+
+def parse_movie(row):
+    """Returns the movie columns of one imdb.csv row, or None if it has no title."""
+    if not pd.notna(row['Movie_title']):
+        return None
+    # A missing year is stored as NULL, the same as upsert_db.py, so both key the movie as (title, None)
+    release_date = datetime(int(row['Year']), 1, 1) if pd.notna(row['Year']) else None
+    try:
+        average_rating = float(row['IMDB Rating']) if pd.notna(row['IMDB Rating']) else None
+    except ValueError:
+        average_rating = None  # Default or error handling for invalid data
+    return {
+        'title': row['Movie_title'],
+        'release_date': release_date,
+        'average_rating': average_rating,
+        'genre': row['Genre'] if pd.notna(row['Genre']) else None,
+        'duration': row['Duration'] if pd.notna(row['Duration']) else None,
+        'gross_earnings': row['Gross earnings'] if pd.notna(row['Gross earnings']) else None,
+        'image': row['Images'],
+    }
+
+
+def bulk_import(session, data):
+    """
+    Imports the rows of imdb.csv in one transaction.
+
+    Existing people are read once into name -> id dicts, new ids are handed
+    out in memory, and every table is written with one executemany, so the
+    number of queries does not grow with the number of rows. Movies already
+    in the database (same title and year) are skipped, so running it again
+    adds nothing; use upsert_db.py to pick up changed rows.
+    """
+    existing = {(title, release_date.year if release_date else None)
+                for title, release_date in session.query(Movie.title, Movie.release_date)}
+    director_ids = dict(session.query(Director.name, Director.id))
+    actor_ids = dict(session.query(Actor.name, Actor.id))
+    next_id = {
+        Movie: (session.query(func.max(Movie.id)).scalar() or 0) + 1,
+        Director: (session.query(func.max(Director.id)).scalar() or 0) + 1,
+        Actor: (session.query(func.max(Actor.id)).scalar() or 0) + 1,
+    }
+    rows = {Movie: [], Director: [], Actor: []}
+
+    def person_id(model, ids, name):
+        if name not in ids:
+            ids[name] = next_id[model]
+            next_id[model] += 1
+            rows[model].append({'id': ids[name], 'name': name})
+        return ids[name]
+
+    crew = []
+    cast = []
+    for row in data.to_dict('records'):
+        movie = parse_movie(row)
+        if movie is None:
+            continue
+        key = (movie['title'], movie['release_date'].year if movie['release_date'] else None)
+        if key in existing:
+            continue
+        existing.add(key)
+        movie['id'] = next_id[Movie]
+        next_id[Movie] += 1
+        rows[Movie].append(movie)
+        # dict.fromkeys drops a name listed twice for the same movie
+        for name in dict.fromkeys(parse_names(row['Director'])):
+            crew.append({'movie_id': movie['id'], 'director_id': person_id(Director, director_ids, name)})
+        for name in dict.fromkeys(parse_names(row['Actors'])):
+            cast.append({'movie_id': movie['id'], 'actor_id': person_id(Actor, actor_ids, name)})
+
+    for model in (Movie, Director, Actor):
+        session.bulk_insert_mappings(model, rows[model])
+    if crew:
+        session.execute(movie_directors.insert(), crew)
+    if cast:
+        session.execute(movie_actors.insert(), cast)
+    # Recount the director-actor collaborations from the join tables in one statement
+    session.execute(director_actors.delete())
+    session.execute(director_actors.insert().from_select(
+        ['director_id', 'actor_id', 'movies'],
+        select(movie_directors.c.director_id, movie_actors.c.actor_id,
+               func.count(func.distinct(movie_actors.c.movie_id)))
+        .join_from(movie_directors, movie_actors, movie_directors.c.movie_id == movie_actors.c.movie_id)
+        .group_by(movie_directors.c.director_id, movie_actors.c.actor_id)))
+    session.commit()
+    return len(rows[Movie]), len(rows[Actor]), len(rows[Director])
+
 # %%
 data = pd.read_csv('imdb.csv')
 data.head()
 # %%
 try:
-    for _, row in data.iterrows():
-        
-        if not pd.notna(row['Movie_title']):
-            continue
-            
-        if pd.notna(row['Year']):
-            release_date = datetime.strptime(str(row['Year']),'%Y')
-        else:
-            release_date = datetime.now()  # Handle missing or malformed dates
-            
-        try:
-            average_rating = float(row['IMDB Rating'])
-        except ValueError:
-            average_rating = None  # Default or error handling for invalid data
-            
-        if pd.notna(row['Genre']):
-            genre=row['Genre']
-        else:
-            genre = None  # Handle missing or malformed dates
-            
-        if pd.notna(row['Duration']):
-            duration=row['Duration']
-        else:
-            duration = None  # Handle missing or malformed dates
-            
-        if pd.notna(row['Gross earnings']):
-            gross_earnings=row['Gross earnings']
-        else:
-            gross_earnings = None  # Handle missing or malformed dates
-            
-        movie = Movie(title=row['Movie_title'], 
-                    release_date=release_date,
-                    average_rating=average_rating,
-                    genre=genre, 
-                    duration=duration,
-                    gross_earnings=gross_earnings,
-                    image=row['Images'])
-        
-        director_names = row['Director'].split(', ')
-        for name in director_names:
-            director = session.query(Director).filter_by(name=name).first()
-            if not director:
-                director = Director(name=name)
-            movie.directors.append(director)
-        
-        actors_list = eval(row['Actors'])
-        for name in actors_list:
-            actor = session.query(Actor).filter_by(name=name).first()
-            if not actor:
-                actor = Actor(name=name)
-            movie.actors.append(actor)
-        session.add(movie)
-
-    session.commit()
+    bulk_import(session, data)
 except Exception as e:
     print(f"An error occurred: {e}")
     session.rollback()  
@@ -23,14 +23,16 @@ class GraphAttentionLayer(nn.Module):
         nn.init.xavier_uniform_(self.a.data, gain=1.414)
 
     def forward(self, input, adj):
+        """adj 可以是稠密的 N x N 矩阵, 也可以是稀疏 (COO) 张量; 稀疏时内存随边数线性增长"""
+        if adj.is_sparse:
+            # 与稠密版本的 adj > 0 一致: 只保留合并重复项之后值为正的边
+            adj = adj.coalesce()
+            return self.forward_sparse(input, adj.indices()[:, adj.values() > 0])
         h = torch.matmul(input, self.W)
-        N = h.size(0)
-        
-        h_repeated = h.unsqueeze(1).repeat(1, N, 1)
-        h_repeated_transposed = h.unsqueeze(0).repeat(N, 1, 1)
-        a_input = torch.cat([h_repeated, h_repeated_transposed], dim=-1)
-        
-        e = self.leakyrelu(torch.matmul(a_input, self.a).squeeze(2))
+
+        # a^T [h_i || h_j] = a_1^T h_i + a_2^T h_j, 不需要构造 N x N x 2F 的张量
+        source, target = self.attention_projections(h)
+        e = self.leakyrelu(source + target.T)
 
         zero_vec = -9e15*torch.ones_like(e)
         attention = torch.where(adj > 0, e, zero_vec)
@@ -41,6 +43,35 @@ class GraphAttentionLayer(nn.Module):
         h_prime = torch.matmul(attention, h)
         return F.elu(h_prime)
 
+    def attention_projections(self, h):
+        """两个注意力投影 a_1^T h 和 a_2^T h, 形状都是 N x 1"""
+        return torch.matmul(h, self.a[:self.out_features]), torch.matmul(h, self.a[self.out_features:])
+
+    def forward_sparse(self, input, edge_index):
+        """
+        边列表上的注意力: edge_index 是 2 x E 的 (行, 列), 即节点 i 关注节点 j.
+        对每个 i 的出边做 scatter-softmax, 内存为 O(N F + E).
+        """
+        h = torch.matmul(input, self.W)
+        N = h.size(0)
+        row, col = edge_index
+        source, target = self.attention_projections(h)
+        e = self.leakyrelu(source[row, 0] + target[col, 0])
+
+        # 每行减去最大值再求 softmax, 与稠密版本的 F.softmax 数值上一致
+        e_max = torch.full((N,), float('-inf'), dtype=e.dtype, device=e.device)
+        e_max = e_max.scatter_reduce(0, row, e, reduce='amax', include_self=True)
+        exp = torch.exp(e - e_max[row])
+        denominator = torch.zeros(N, dtype=e.dtype, device=e.device).index_add_(0, row, exp)
+        attention = self.dropout(exp / denominator[row])
+
+        h_prime = torch.zeros_like(h).index_add_(0, row, attention.unsqueeze(1) * h[col])
+        # 稠密版本中没有邻居的行对所有节点平均分配注意力, 这里保持一致
+        isolated = denominator == 0
+        if isolated.any():
+            h_prime[isolated] = h.mean(dim=0)
+        return F.elu(h_prime)
+
 class GATModel(nn.Module):
     def __init__(self, feature_dim, embed_dim, num_heads=4, dropout=0.6, alpha=0.2):
         super(GATModel, self).__init__()
@@ -67,22 +98,23 @@ def find_most_similar(embeddings, query_embedding, n=5):
     top_indices = similarity_scores.argsort(descending=True)[:n]
     return top_indices
 
-# 初始化特征矩阵嵌入和预测特征嵌入
-feature_matrix_embed = torch.randn(128, 2048)
-prediction_feature_embed = torch.randn(128, 2048)
+if __name__ == '__main__':
+    # 初始化特征矩阵嵌入和预测特征嵌入
+    feature_matrix_embed = torch.randn(128, 2048)
+    prediction_feature_embed = torch.randn(128, 2048)
 
-# 初始化邻接矩阵（这里假设是全连接图）
-adj_matrix = torch.ones(feature_matrix_embed.size(0), feature_matrix_embed.size(0))
+    # 初始化邻接矩阵（这里假设是全连接图）
+    adj_matrix = torch.ones(feature_matrix_embed.size(0), feature_matrix_embed.size(0))
 
-# 初始化GAT模型
-gat_model = GATModel(2048, 128)
+    # 初始化GAT模型
+    gat_model = GATModel(2048, 128)
 
-# 将特征矩阵嵌入和预测特征嵌入输入GAT模型
-feature_matrix_output = gat_model(feature_matrix_embed, adj_matrix)
-prediction_feature_output = gat_model(prediction_feature_embed, adj_matrix)
+    # 将特征矩阵嵌入和预测特征嵌入输入GAT模型
+    feature_matrix_output = gat_model(feature_matrix_embed, adj_matrix)
+    prediction_feature_output = gat_model(prediction_feature_embed, adj_matrix)
 
-# 寻找最相关的嵌入索引
-n_most_similar = 5
-for i in range(prediction_feature_output.size(0)):
-    most_similar_indices = find_most_similar(feature_matrix_output, prediction_feature_output[i], n_most_similar)
-    print(f"For prediction feature {i}, most similar embeddings indices: {most_similar_indices}")
+    # 寻找最相关的嵌入索引
+    n_most_similar = 5
+    for i in range(prediction_feature_output.size(0)):
+        most_similar_indices = find_most_similar(feature_matrix_output, prediction_feature_output[i], n_most_similar)
+        print(f"For prediction feature {i}, most similar embeddings indices: {most_similar_indices}")
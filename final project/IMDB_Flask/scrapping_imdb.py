@@ -1,118 +1,227 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
+import lxml.html
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
-pages = list(range(1,7))
-
-title = []
-runtime = []
-genre = []
-imdb_rating = []
-year = []
-metascore = []
-director_names = []
-actors_names = []
-gross = []
-image_links = []
-
-for page in tqdm(pages):
-    params = {
+import upsert_db
+
+LIST_URL = 'https://www.imdb.com/list/ls062911411/'
+PAGES = list(range(1, 7))
+CACHE_DIR = '.http_cache'
+
+
+def page_params(page):
+    return {
         'st_dt': '',
         'mode': 'detail',
         'page': page,
         'sort': 'list_order,asc'
     }
 
-    web_page_url = 'https://www.imdb.com/list/ls062911411/'
-
-    response = requests.get(web_page_url, params=params)
-
 
-    film_soup = BeautifulSoup(response.content, 'html.parser')
+class HttpCache:
+    """
+    HTTP responses cached on disk, keyed by URL and query parameters.
+
+    A cached page is revalidated with If-None-Match / If-Modified-Since, so an
+    unchanged page costs a 304 with no body instead of a full download.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, url, params=None):
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        try:
+            with open(os.path.join(self.directory, key + '.json')) as f:
+                meta = json.load(f)
+            with open(os.path.join(self.directory, key + '.html'), 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, key, meta, body):
+        # Write the body first and replace atomically, so a crash never leaves metadata without its page
+        for suffix, data in (('.html', body), ('.json', json.dumps(meta).encode('utf-8'))):
+            path = os.path.join(self.directory, key + suffix)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+
+    def get(self, session, url, params=None, timeout=30):
+        """Returns the body of a page, revalidating a cached copy when there is one."""
+        key = self.key(url, params)
+        meta, body = self.load(key)
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and body is not None:
+            return body
+        response.raise_for_status()
+        self.store(key, {'url': response.url,
+                         'etag': response.headers.get('ETag'),
+                         'last_modified': response.headers.get('Last-Modified')}, response.content)
+        return response.content
+
+
+def fetch_pages(url=LIST_URL, pages=PAGES, cache=None, workers=6):
+    """
+    Fetches the list pages concurrently over one pooled session, in page order.
+    """
+    session = requests.Session()
+    # Keep one connection per worker alive, instead of a new TCP/TLS handshake per page
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    def fetch(page):
+        if cache is not None:
+            return cache.get(session, url, page_params(page))
+        response = session.get(url, params=page_params(page), timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    with session, ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        return list(tqdm(pool.map(fetch, pages), total=len(pages)))
+
+
+def has_class(name):
+    """XPath test for one class among several, like BeautifulSoup's class_=name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def string(element):
+    """The text of a tag with a single string inside, else None, like BeautifulSoup's .string"""
+    if element is None:
+        return None
+    if len(element) == 0:
+        return element.text
+    if len(element) == 1 and not element.text and not element[0].tail:
+        return string(element[0])
+    return None
+
+
+def first(element, path):
+    found = element.xpath(path)
+    return found[0] if found else None
+
+
+def parse_page(content):
+    """
+    Extracts the columns of one list page from a single lxml parse.
+    """
+    film_tree = lxml.html.fromstring(content)
+    page = {'title': [], 'runtime': [], 'genre': [], 'imdb_rating': [], 'year': [], 'metascore': [],
+            'director_names': [], 'actors_names': [], 'gross': [], 'image_links': []}
+
+    for image in film_tree.xpath(f'//img[{has_class("loadlate")}]'):
+        page['image_links'].append(image.get('loadlate'))
 
     # Get the divs where the movie information is located
-    film_info = film_soup.find_all('div', class_= 'lister-item-content')
+    film_info = film_tree.xpath(f'//div[{has_class("lister-item-content")}]')
 
-    images = film_soup.find_all('img', class_ = 'loadlate')
-
-    for image in images:
-        image_links.append(image['loadlate'])
-        
     # Loop through film_info object to extract necessary information
-    for item in tqdm(film_info):
-        title.append((item.a.string))
+    for item in film_info:
+        page['title'].append(string(first(item, './/a')))
 
-        time_ = item.find('span', class_ = 'runtime')
-        runtime.append(time_.string)
+        time_ = first(item, f'.//span[{has_class("runtime")}]')
+        page['runtime'].append(string(time_))
 
-        genre_= item.find('span', class_ = 'genre')
-        genre.append(((genre_.string).replace('\n', '')).strip())
+        genre_ = first(item, f'.//span[{has_class("genre")}]')
+        page['genre'].append(((string(genre_)).replace('\n', '')).strip())
 
-        rate = item.find('span',class_ = 'ipl-rating-star__rating')
-        imdb_rating.append(float(rate.string))
+        rate = first(item, f'.//span[{has_class("ipl-rating-star__rating")}]')
+        page['imdb_rating'].append(float(string(rate)))
 
-        year_ = item.find('span', class_ = 'lister-item-year text-muted unbold').string.split()
+        year_ = string(first(item, ".//span[@class='lister-item-year text-muted unbold']")).split()
         if len(year_) <= 1:
-            year.append(int(year_[0][1:5]))
+            page['year'].append(int(year_[0][1:5]))
         else:
-            year.append(int(year_[1][1:5]))
+            page['year'].append(int(year_[1][1:5]))
 
-        if item.find('span', class_ = 'metascore favorable') == None:
-            metascore.append(np.nan)
+        metascore_ = first(item, ".//span[@class='metascore favorable']")
+        if metascore_ is None:
+            page['metascore'].append(np.nan)
         else:
-            metascore_ = item.find('span', class_ = 'metascore favorable').string.strip()
-            metascore.append(int(metascore_))
-
-
-    # Create an instance of beautiful soup for directors and actors information
-    directors_actors_soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Retrieve all tags and links that have directors and actors information
-    director_links = directors_actors_soup.find_all('p', {'class': 'text-muted text-small'})
-
-    directors_info = []
-    for links in director_links:
-        directors_info.append(links.a)
-
-    # Retreving director names. Ensuring the list is 100
-    for name in tqdm(directors_info):
-        if name != None:
-            director_names.append(name.string)
-
-    # Retreive actors information
-    actors_links = []
-    for each_tag in directors_actors_soup.find_all('p', {'class': 'text-muted text-small'}):
-        if each_tag.find_all('a') != []:
-            actors_links.append(each_tag.findAll('a')[1:])
-
-
-    for links in actors_links:
-        each_name = []
-        for each_link in tqdm(links):
-            each_name.append(each_link.string)
-        actors_names.append(each_name)
-
-
-    # Retrieve list for gross
-    list_of_grossEarnings = []
-    for i in directors_actors_soup.find_all('p', {'class': 'text-muted text-small'}):
-        list_of_grossEarnings.append(i.findAll('span', {'name': 'nv' }))
-
-
-    for lists in tqdm(list_of_grossEarnings):
+            page['metascore'].append(int(string(metascore_).strip()))
+
+    # The same tags hold directors, actors and gross earnings; find them once
+    for each_tag in film_tree.xpath("//p[@class='text-muted text-small']"):
+        links = each_tag.xpath('.//a')
+        # Retreving director names and actors information
+        if links:
+            page['director_names'].append(string(links[0]))
+            page['actors_names'].append([string(each_link) for each_link in links[1:]])
+
+        # Retrieve list for gross
+        lists = each_tag.xpath(".//span[@name='nv']")
         if len(lists) > 1:
-            gross.append(lists[1].string)
+            page['gross'].append(string(lists[1]))
         elif len(lists) == 1:
-            gross.append('N/A')
-
-print('Done Scrapping!')
-check = [title, runtime, genre, imdb_rating, year, metascore, director_names, actors_names, gross]
-for each_list in check:
-    print(len(each_list))
-
-data_frame = pd.DataFrame({'Movie_title': title, 'Genre': genre, 'Director': director_names, 'Actors': actors_names, 'Duration': runtime, 'Year': year, 'IMDB Rating': imdb_rating, 'Meta Score': metascore, 'Gross earnings': gross, 'Images': image_links[:len(title)]}, index=range(1, len(title)+1))
-
-# save to csv
-data_frame.to_csv('imdb.csv')
\ No newline at end of file
+            page['gross'].append('N/A')
+
+    return page
+
+
+def scrape(url=LIST_URL, pages=PAGES, cache=None, workers=6):
+    """
+    Scrapes the list into the data frame written to imdb.csv.
+    """
+    columns = {}
+    for content in fetch_pages(url, pages, cache, workers):
+        for column, values in parse_page(content).items():
+            columns.setdefault(column, []).extend(values)
+
+    print('Done Scrapping!')
+    title = columns.get('title', [])
+    check = ['title', 'runtime', 'genre', 'imdb_rating', 'year', 'metascore', 'director_names', 'actors_names', 'gross']
+    for each_list in check:
+        print(len(columns.get(each_list, [])))
+
+    return pd.DataFrame({'Movie_title': title, 'Genre': columns.get('genre', []),
+                         'Director': columns.get('director_names', []), 'Actors': columns.get('actors_names', []),
+                         'Duration': columns.get('runtime', []), 'Year': columns.get('year', []),
+                         'IMDB Rating': columns.get('imdb_rating', []), 'Meta Score': columns.get('metascore', []),
+                         'Gross earnings': columns.get('gross', []),
+                         'Images': columns.get('image_links', [])[:len(title)]},
+                        index=range(1, len(title)+1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scrape the IMDB list into imdb.csv.')
+    parser.add_argument('--url', default=LIST_URL, help='the list URL, e.g. a local fixture server')
+    parser.add_argument('--pages', type=int, default=len(PAGES), help='the number of pages')
+    parser.add_argument('--workers', type=int, default=6, help='the number of concurrent requests')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='the HTTP cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='always download every page')
+    parser.add_argument('--output', default='imdb.csv')
+    parser.add_argument('--db', help='also upsert new and changed movies into this database, e.g. movies.db')
+    parser.add_argument('--change-log', default=upsert_db.CHANGE_LOG, help='where --db appends its changes')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else HttpCache(args.cache_dir)
+    data_frame = scrape(args.url, list(range(1, args.pages + 1)), cache, args.workers)
+
+    # save to csv
+    data_frame.to_csv(args.output)
+
+    if args.db:
+        changes = upsert_db.upsert(data_frame.to_dict('records'), args.db, args.change_log)
+        print(f'{len(changes)} movies added or changed')
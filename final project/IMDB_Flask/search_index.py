@@ -0,0 +1,116 @@
+import bisect
+import heapq
+import re
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """小写后按单词切分"""
+    return TOKEN.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """
+    内存中的搜索索引.
+
+    - 自动补全: 按小写名字排序的列表, 用二分查找前缀范围.
+    - 全文搜索: 倒排索引 token -> 节点 id, 查询的最后一个词按前缀匹配
+      (在排好序的词表上二分), 其余词精确匹配, 结果取交集.
+    """
+
+    def __init__(self):
+        self.postings = {}        # token -> set of node ids
+        self.vocabulary = []      # 排好序的全部 token
+        self.labels = {}          # node id -> (名字, 类型)
+        self.label_tokens = {}    # node id -> 名字里的 token
+        self.sorted_labels = []   # 排好序的 (小写名字, node id)
+        self.documents = {}       # node id -> 它的全部 token, 用于删除
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, node_id, kind, label, *texts):
+        """索引一个节点: label 是片名或姓名, texts 是其他可搜索的文字 (例如类型)"""
+        self.labels[node_id] = (label, kind)
+        self.label_tokens[node_id] = set(tokenize(label))
+        bisect.insort(self.sorted_labels, (label.lower(), node_id))
+        self.extend(node_id, label, *texts)
+
+    def extend(self, node_id, *texts):
+        """给已索引的节点添加可搜索的文字, 例如电影的演员名字"""
+        for text in texts:
+            for token in tokenize(text):
+                self.documents.setdefault(node_id, set()).add(token)
+                ids = self.postings.get(token)
+                if ids is None:
+                    ids = self.postings[token] = set()
+                    bisect.insort(self.vocabulary, token)
+                ids.add(node_id)
+
+    def remove(self, node_id):
+        """从索引中删除一个节点; 不再使用的 token 留在词表里, 对应的集合为空"""
+        if node_id not in self.labels:
+            return
+        label = self.labels.pop(node_id)[0]
+        del self.label_tokens[node_id]
+        i = bisect.bisect_left(self.sorted_labels, (label.lower(), node_id))
+        if i < len(self.sorted_labels) and self.sorted_labels[i] == (label.lower(), node_id):
+            del self.sorted_labels[i]
+        for token in self.documents.pop(node_id, ()):
+            self.postings[token].discard(node_id)
+
+    def suggest(self, prefix, limit=10):
+        """名字以 prefix 开头的节点, 按名字排序"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        results = []
+        i = bisect.bisect_left(self.sorted_labels, (prefix,))
+        while i < len(self.sorted_labels) and len(results) < limit:
+            label, node_id = self.sorted_labels[i]
+            if not label.startswith(prefix):
+                break
+            results.append(self.result(node_id))
+            i += 1
+        return results
+
+    def prefix_ids(self, prefix):
+        """所有以 prefix 开头的 token 对应的节点 id"""
+        ids = set()
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            ids |= self.postings[self.vocabulary[i]]
+            i += 1
+        return ids
+
+    def search(self, query, limit=20):
+        """
+        全文搜索. 名字以查询开头的排最前, 其次是名字里包含全部查询词的,
+        最后是只通过类型或演员等其他文字匹配到的.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        candidates = [self.postings.get(token, set()) for token in tokens[:-1]]
+        candidates.append(self.prefix_ids(tokens[-1]))
+        candidates.sort(key=len)
+        ids = set(candidates[0]).intersection(*candidates[1:])
+        query = query.strip().lower()
+
+        def rank(node_id):
+            label = self.labels[node_id][0]
+            words = self.label_tokens[node_id]
+            if label.lower().startswith(query):
+                tier = 0
+            elif all(token in words for token in tokens[:-1]) and any(word.startswith(tokens[-1]) for word in words):
+                tier = 1
+            else:
+                tier = 2
+            return tier, label.lower(), node_id
+
+        return [self.result(node_id) for node_id in heapq.nsmallest(limit, ids, key=rank)]
+
+    def result(self, node_id):
+        label, kind = self.labels[node_id]
+        return {'id': node_id, 'kind': kind, 'label': label}
@@ -0,0 +1,315 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+import app
+# setUpModule imports create_db.py in a temporary directory for build_database
+from unittest_upsert_db import build_database, rows, setUpModule, tearDownModule
+
+
+def form(**fields):
+    """The /add_movie form, with empty fields unless given"""
+    data = dict.fromkeys(['title', 'genre', 'duration', 'gross_earnings', 'image_url', 'actors', 'directors',
+                          'average_rating'], '')
+    data['release_date'] = '2020-01-01'
+    data.update(fields)
+    return data
+
+
+class AppTestCase(unittest.TestCase):
+    """Runs the app on a temporary movies.db built from the test rows of unittest_upsert_db"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = os.path.join(self.directory, 'movies.db')
+        build_database(self.database, rows())
+        self.config = {key: app.app.config[key] for key in ('DATABASE', 'CHANGE_LOG')}
+        app.app.config.update(DATABASE=self.database, CHANGE_LOG=os.path.join(self.directory, 'changes.jsonl'))
+        app.load_graph()
+        self.graph = app.graph
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.app.config.update(self.config)
+        app.load_graph()
+        shutil.rmtree(self.directory)
+
+
+class TestRegistry(AppTestCase):
+
+    def test_find(self):
+        movie = self.graph.find(app.Movies, 'Citizen Kane')
+        self.assertIsInstance(movie, app.Movies)
+        self.assertEqual(movie.title, 'Citizen Kane')
+        self.assertEqual(sorted(person.name for person in movie.actors),
+                         ['Agnes Moorehead', 'Joseph Cotten', 'Orson Welles'])
+        # The same name is a different node in every type
+        actor = self.graph.find(app.Actors, 'Orson Welles')
+        director = self.graph.find(app.Directors, 'Orson Welles')
+        self.assertIsInstance(actor, app.Actors)
+        self.assertIsInstance(director, app.Directors)
+        self.assertNotEqual(actor.id, director.id)
+        self.assertIsNone(self.graph.find(app.Movies, 'Orson Welles'))
+        self.assertIsNone(self.graph.find(app.Actors, 'No Such Actor'))
+
+    def test_nodes_of(self):
+        self.assertEqual(sorted(movie.title for movie in self.graph.nodes_of(app.Movies)),
+                         sorted(row['Movie_title'] for row in rows()))
+        self.assertEqual(sorted(director.name for director in self.graph.nodes_of(app.Directors)),
+                         ['Carol Reed', 'Orson Welles'])
+        for kind in app.KINDS:
+            self.assertTrue(all(type(node) is kind for node in self.graph.nodes_of(kind)))
+        self.assertEqual(sum(len(self.graph.nodes_of(kind)) for kind in app.KINDS), len(self.graph.nodes))
+
+    def test_add_routes(self):
+        actors = len(self.graph.nodes_of(app.Actors))
+        self.client.post('/add_movie', data=form(title='F for Fake', actors='Orson Welles, Oja Kodar',
+                                                 directors='Orson Welles'))
+        # Existing people are found by name instead of being added again
+        self.assertEqual(len(self.graph.nodes_of(app.Actors)), actors + 1)
+        movie = self.graph.find(app.Movies, 'F for Fake')
+        self.assertIs(movie.actors[0], self.graph.find(app.Actors, 'Orson Welles'))
+        self.assertIs(movie.directors[0], self.graph.find(app.Directors, 'Orson Welles'))
+        self.client.post('/add_actor', data={'name': 'Ruth Warrick', 'movies': 'Citizen Kane, Journey into Fear'})
+        self.assertEqual(self.graph.find(app.Actors, 'Ruth Warrick').name, 'Ruth Warrick')
+        self.assertIsNotNone(self.graph.find(app.Movies, 'Journey into Fear'))
+        self.client.post('/add_director', data={'name': 'Carol Reed', 'movies': 'Oliver!'})
+        self.assertEqual(len(self.graph.nodes_of(app.Directors)), 2)
+        self.assertEqual([director.name for director in self.graph.find(app.Movies, 'Oliver!').directors],
+                         ['Carol Reed'])
+
+
+class TestIds(AppTestCase):
+
+    def test_past_9999(self):
+        graph = app.Graph()
+        ids = {kind: [graph.new_id(kind) for _ in range(12000)] for kind in app.KINDS}
+        for kind, kind_ids in ids.items():
+            self.assertEqual(kind_ids, sorted(set(kind_ids)))
+            self.assertEqual({node_id % len(app.ID_SPACES) for node_id in kind_ids}, {app.ID_SPACES[kind]})
+        self.assertEqual(len(set().union(*ids.values())), 3 * 12000)
+
+    def test_threads(self):
+        graph = app.Graph()
+        ids = []
+        threads = [threading.Thread(target=lambda: ids.extend(graph.new_id(app.Actors) for _ in range(2000)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(ids)), 8 * 2000)
+
+    def test_database_keys(self):
+        # Node ids come from the primary keys, so the same key in two tables gives two nodes
+        connection = sqlite3.connect(self.database)
+        with connection:
+            connection.execute("INSERT INTO movie (id, title) VALUES (12345, 'Chimes at Midnight')")
+            connection.execute("INSERT INTO actor (id, name) VALUES (12345, 'Jeanne Moreau')")
+            connection.execute("INSERT INTO director (id, name) VALUES (12345, 'Orson Welles II')")
+            connection.execute('INSERT INTO movie_actors (movie_id, actor_id) VALUES (12345, 12345)')
+        connection.close()
+        app.load_graph()
+        graph = app.graph
+        movie = graph.find(app.Movies, 'Chimes at Midnight')
+        actor = graph.find(app.Actors, 'Jeanne Moreau')
+        director = graph.find(app.Directors, 'Orson Welles II')
+        self.assertEqual(movie.id, app.node_id(app.Movies, 12345))
+        self.assertEqual(len({movie.id, actor.id, director.id}), 3)
+        self.assertEqual(graph.edges[movie.id], {actor.id})
+        self.assertEqual(self.client.get('/movie/%d' % movie.id).status_code, 200)
+        # Nodes added through the forms never reuse a database key
+        self.client.post('/add_movie', data=form(title='Web Added Movie', actors='Web Actor'))
+        keys = [node.id // len(app.ID_SPACES) for node in (graph.find(app.Movies, 'Web Added Movie'),
+                                                            graph.find(app.Actors, 'Web Actor'))]
+        self.assertTrue(all(key >= app.LOCAL_KEY_START for key in keys))
+
+
+class TestListings(AppTestCase):
+
+    def listing(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        html = response.get_data(as_text=True)
+        return response, len(re.findall(r'class="list-group-item\b', html)), re.findall(r'Page (\d+) of (\d+)', html)
+
+    def test_pagination(self):
+        response, items, pages = self.listing('/movies?per_page=3')
+        self.assertEqual((response.status_code, items, pages), (200, 3, [('1', '2')]))
+        self.assertEqual(self.listing('/movies?per_page=3&page=2')[1:], (1, [('2', '2')]))
+        # Past the last page the list is empty; page and per_page are clamped to their bounds
+        self.assertEqual(self.listing('/movies?per_page=3&page=9')[1:], (0, [('9', '2')]))
+        self.assertEqual(self.listing('/movies?per_page=3&page=-4')[1:], (3, [('1', '2')]))
+        self.assertEqual(self.listing('/movies?per_page=0')[1:], (1, [('1', '4')]))
+        self.assertEqual(self.listing('/movies?per_page=100000')[1:], (4, []))
+        self.assertEqual(self.listing('/movies?page=x&per_page=y')[1:], (4, []))
+        self.assertTrue(self.listing('/movies?per_page=100000')[0].headers['ETag'].endswith('-1-500"'))
+        self.assertEqual(self.listing('/actors?per_page=2&page=3')[1:], (1, [('3', '3')]))
+        self.assertEqual(self.listing('/directors?per_page=1')[1:], (1, [('1', '2')]))
+
+    def test_filmographies(self):
+        html = self.client.get('/actors').get_data(as_text=True)
+        # Every actor is listed once, and every movie once under each of its actors
+        self.assertEqual(html.count('Joseph Cotten'), 1)
+        self.assertEqual({title: html.count(title) for title in ('Citizen Kane', 'The Third Man', 'Ambersons')},
+                         {'Citizen Kane': 3, 'The Third Man': 3, 'Ambersons': 2})
+
+    def test_etag(self):
+        response = self.client.get('/movies')
+        etag = response.headers['ETag']
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        response = self.client.get('/movies', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(self.client.get('/movies?page=2', headers={'If-None-Match': etag}).status_code, 200)
+
+        self.client.post('/add_movie', data=form(title='Touch of Evil', actors='Orson Welles'))
+        response = self.client.get('/movies', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn('Touch of Evil', response.get_data(as_text=True))
+        # The actors page was rendered before the change too, and is not served from the old cache
+        self.assertIn('Touch of Evil', self.client.get('/actors').get_data(as_text=True))
+
+    def test_etag_after_reload(self):
+        etag = self.client.get('/movies').headers['ETag']
+        app.load_graph()
+        response = self.client.get('/movies', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+class TestCollaborators(AppTestCase):
+
+    def brute_force(self):
+        """{person id: {person id: shared movies}}, counted straight from movie_actors and movie_directors"""
+        connection = sqlite3.connect(self.database)
+        try:
+            credits = [(movie_id, app.node_id(app.Actors, key))
+                       for movie_id, key in connection.execute('SELECT movie_id, actor_id FROM movie_actors')]
+            credits += [(movie_id, app.node_id(app.Directors, key))
+                        for movie_id, key in connection.execute('SELECT movie_id, director_id FROM movie_directors')]
+        finally:
+            connection.close()
+        counts = {}
+        for movie_id, person_id in credits:
+            for other_movie_id, other_id in credits:
+                if movie_id == other_movie_id and person_id != other_id:
+                    counts.setdefault(person_id, {}).setdefault(other_id, 0)
+                    counts[person_id][other_id] += 1
+        return counts
+
+    def collaborators(self, person_id, kind=None):
+        response = self.client.get('/person/%d/collaborators' % person_id, query_string={'kind': kind} if kind else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def test_counts(self):
+        expected = self.brute_force()
+        for kind in (app.Actors, app.Directors):
+            for person in self.graph.nodes_of(kind):
+                data = self.collaborators(person.id)
+                self.assertEqual((data['name'], data['kind']), (person.name, app.KINDS[kind]))
+                self.assertEqual({other['id']: other['movies'] for other in data['collaborators']},
+                                 expected.get(person.id, {}))
+                counts = [other['movies'] for other in data['collaborators']]
+                self.assertEqual(counts, sorted(counts, reverse=True))
+                actors = self.collaborators(person.id, 'actor')['collaborators']
+                self.assertEqual({other['id']: other['movies'] for other in actors},
+                                 {other_id: count for other_id, count in expected.get(person.id, {}).items()
+                                  if other_id in self.graph.registry[app.Actors]})
+
+    def test_director(self):
+        # Carol Reed directed The Third Man, with Joseph Cotten, Orson Welles and Alida Valli
+        director = self.graph.find(app.Directors, 'Carol Reed')
+        actors = self.collaborators(director.id, 'actor')['collaborators']
+        self.assertEqual(sorted((other['name'], other['movies']) for other in actors),
+                         [('Alida Valli', 1), ('Joseph Cotten', 1), ('Orson Welles', 1)])
+        cotten = self.graph.find(app.Actors, 'Joseph Cotten')
+        self.assertEqual([(other['name'], other['movies'], other['kind'])
+                          for other in self.collaborators(cotten.id, 'director')['collaborators']],
+                         [('Orson Welles', 2, 'director'), ('Carol Reed', 1, 'director')])
+        self.assertEqual(self.client.get('/person/1/collaborators').status_code, 404)
+
+    def test_add_routes(self):
+        self.client.post('/add_movie', data=form(title='Journey into Fear', actors='Joseph Cotten, Orson Welles',
+                                                 directors='Norman Foster'))
+        self.client.post('/add_actor', data={'name': 'Ruth Warrick', 'movies': 'Citizen Kane, Journey into Fear'})
+        self.client.post('/add_director', data={'name': 'Orson Welles', 'movies': 'Journey into Fear'})
+        # The counts kept up by the routes match a full recount
+        counts = {person_id: dict(counter) for person_id, counter in self.graph.collaborators.items() if +counter}
+        self.graph.build_collaborators()
+        self.assertEqual(counts, {person_id: dict(counter) for person_id, counter in self.graph.collaborators.items()})
+        cotten = self.graph.find(app.Actors, 'Joseph Cotten')
+        welles = self.graph.find(app.Actors, 'Orson Welles')
+        self.assertEqual(counts[cotten.id][welles.id], 3)
+        self.assertEqual(counts[cotten.id][self.graph.find(app.Directors, 'Orson Welles').id], 3)
+
+
+class TestEdges(AppTestCase):
+
+    def test_add_edges(self):
+        graph = app.Graph()
+        movie = app.Movies(graph.new_id(app.Movies), 'Othello', datetime(1951, 1, 1), None, None, None, None, None)
+        actor = app.Actors(graph.new_id(app.Actors), 'Orson Welles', True)
+        director = app.Directors(graph.new_id(app.Directors), 'Orson Welles', True)
+        for node in (movie, actor, director):
+            graph.add_node(node)
+        pairs = [(movie.id, actor.id), (movie.id, director.id), (actor.id, movie.id), (director.id, movie.id)]
+        self.assertEqual(graph.add_edges(pairs + pairs[:2]), 4)
+        version = graph.version
+        # Adding them again changes nothing, not even the version
+        self.assertEqual(graph.add_edges(iter(pairs)), 0)
+        graph.add_edge(movie.id, actor.id)
+        self.assertEqual(graph.version, version)
+        self.assertEqual(graph.edges[movie.id], {actor.id, director.id})
+        self.assertEqual(graph.reverse[movie.id], {actor.id, director.id})
+        self.assertEqual(graph.reverse[actor.id], {movie.id})
+        self.assertEqual(graph.adjacency[movie.id], {app.Actors: {actor.id}, app.Directors: {director.id}})
+        self.assertEqual(graph.adjacency[actor.id], {app.Movies: {movie.id}})
+        self.assertEqual(graph.people_of(movie.id), {actor.id, director.id})
+        self.assertEqual(graph.neighbors(actor.id, app.Directors), set())
+        # Edges from an unknown node are ignored
+        self.assertEqual(graph.add_edges([(-1, movie.id)]), 0)
+        self.assertNotIn(-1, graph.reverse[movie.id])
+
+        self.assertEqual(graph.remove_edges([(movie.id, actor.id), (movie.id, actor.id)]), 1)
+        self.assertEqual(graph.edges[movie.id], {director.id})
+        self.assertEqual(graph.reverse[actor.id], set())
+        self.assertEqual(graph.adjacency[movie.id][app.Actors], set())
+        self.assertEqual(graph.remove_edges([(movie.id, actor.id)]), 0)
+
+    def test_loaded_graph(self):
+        # reverse is edges turned around, and adjacency is edges split by the type of the target
+        for node_id, targets in self.graph.edges.items():
+            for target in targets:
+                self.assertIn(node_id, self.graph.reverse[target])
+            by_type = {}
+            for target in targets:
+                by_type.setdefault(type(self.graph.nodes[target]), set()).add(target)
+            self.assertEqual({kind: ids for kind, ids in self.graph.adjacency[node_id].items() if ids}, by_type)
+        self.assertEqual(sum(map(len, self.graph.edges.values())), sum(map(len, self.graph.reverse.values())))
+        # Every credit is one edge each way
+        kane = self.graph.find(app.Movies, 'Citizen Kane')
+        self.assertEqual(len(self.graph.edges[kane.id]), 4)
+        self.assertEqual(self.graph.reverse[kane.id], self.graph.edges[kane.id])
+
+    def test_repeated_credit(self):
+        movie = self.graph.find(app.Movies, 'Citizen Kane')
+        edges = sum(map(len, self.graph.edges.values()))
+        self.client.post('/add_actor', data={'name': 'Ruth Warrick', 'movies': 'Citizen Kane, Citizen Kane'})
+        self.client.post('/add_director', data={'name': 'Orson Welles', 'movies': 'Citizen Kane'})
+        self.assertEqual(sum(map(len, self.graph.edges.values())), edges + 2)
+        self.assertEqual([person.name for person in movie.actors].count('Ruth Warrick'), 1)
+        self.assertEqual([person.name for person in movie.directors], ['Orson Welles'])
+        html = self.client.get('/actors').get_data(as_text=True)
+        self.assertEqual(html.count('Citizen Kane'), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import torch
+
+import demo
+
+
+class TestGraphAttentionLayer(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(507)
+        self.features = torch.randn(60, 32)
+        self.layer = demo.GraphAttentionLayer(32, 8)
+        self.layer.eval()
+
+    def assertSparseMatchesDense(self, module, features, adj):
+        with torch.no_grad():
+            dense = module(features, adj)
+            sparse = module(features, adj.to_sparse())
+        self.assertTrue(torch.allclose(dense, sparse, atol=1e-5), (dense - sparse).abs().max())
+
+    def test_binary(self):
+        adj = (torch.rand(60, 60) < 0.1).float()
+        adj[:3] = 0  # nodes without neighbors
+        self.assertSparseMatchesDense(self.layer, self.features, adj)
+
+    def test_weighted_and_signed(self):
+        # Only positive entries are edges in the dense version, whatever their weight
+        adj = torch.randn(60, 60) * (torch.rand(60, 60) < 0.2)
+        self.assertSparseMatchesDense(self.layer, self.features, adj)
+
+    def test_uncoalesced(self):
+        # Duplicate entries are summed before the sign is looked at
+        rows = torch.tensor([0, 0, 1, 1, 2, 2, 3])
+        cols = torch.tensor([1, 1, 2, 2, 3, 3, 0])
+        values = torch.tensor([1.0, 2.0, 1.0, -1.0, -2.0, 1.0, 0.5])
+        adj = torch.sparse_coo_tensor(torch.stack([rows, cols]), values, (60, 60), check_invariants=True)
+        with torch.no_grad():
+            self.assertTrue(torch.allclose(self.layer(self.features, adj),
+                                           self.layer(self.features, adj.to_dense()), atol=1e-5))
+
+    def test_model(self):
+        model = demo.GATModel(32, 16)
+        model.eval()
+        self.assertSparseMatchesDense(model, self.features, torch.ones(60, 60))
+
+    def test_gradient(self):
+        adj = (torch.rand(60, 60) < 0.2).float()
+        features = self.features.clone().requires_grad_()
+        dense = torch.autograd.grad(self.layer(features, adj).sum(), features)[0]
+        sparse = torch.autograd.grad(self.layer(features, adj.to_sparse()).sum(), features)[0]
+        self.assertTrue(torch.allclose(dense, sparse, atol=1e-5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import hashlib
+import http.server
+import math
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+
+import scrapping_imdb
+
+PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'imdb_list_page.html')
+
+
+def soup_page(content):
+    """The columns of one page, extracted the way the original BeautifulSoup script did it"""
+    page = {'title': [], 'runtime': [], 'genre': [], 'imdb_rating': [], 'year': [], 'metascore': [],
+            'director_names': [], 'actors_names': [], 'gross': [], 'image_links': []}
+    film_soup = BeautifulSoup(content, 'html.parser')
+    for image in film_soup.find_all('img', class_='loadlate'):
+        page['image_links'].append(image['loadlate'])
+    for item in film_soup.find_all('div', class_='lister-item-content'):
+        page['title'].append(item.a.string)
+        page['runtime'].append(item.find('span', class_='runtime').string)
+        page['genre'].append(item.find('span', class_='genre').string.replace('\n', '').strip())
+        page['imdb_rating'].append(float(item.find('span', class_='ipl-rating-star__rating').string))
+        year_ = item.find('span', class_='lister-item-year text-muted unbold').string.split()
+        page['year'].append(int(year_[0][1:5]) if len(year_) <= 1 else int(year_[1][1:5]))
+        if item.find('span', class_='metascore favorable') is None:
+            page['metascore'].append(np.nan)
+        else:
+            page['metascore'].append(int(item.find('span', class_='metascore favorable').string.strip()))
+    tags = film_soup.find_all('p', {'class': 'text-muted text-small'})
+    for tag in tags:
+        if tag.a is not None:
+            page['director_names'].append(tag.a.string)
+        if tag.find_all('a') != []:
+            page['actors_names'].append([link.string for link in tag.find_all('a')[1:]])
+        lists = tag.find_all('span', {'name': 'nv'})
+        if len(lists) > 1:
+            page['gross'].append(lists[1].string)
+        elif len(lists) == 1:
+            page['gross'].append('N/A')
+    return page
+
+
+class ListPageHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the saved list page for every URL, with an ETag and Last-Modified"""
+    body = b''
+    statuses = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        etag = '"%s"' % hashlib.sha1(self.body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Sat, 01 Apr 2023 00:00:00 GMT')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+class TestScrapping(unittest.TestCase):
+
+    def setUp(self):
+        with open(PAGE, 'rb') as f:
+            self.content = f.read()
+        ListPageHandler.body = self.content
+        ListPageHandler.statuses = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ListPageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/list/ls062911411/' % self.server.server_port
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_parse_page(self):
+        page = scrapping_imdb.parse_page(self.content)
+        expected = soup_page(self.content)
+        self.assertEqual(list(page), list(expected))
+        for column in page:
+            self.assertEqual([None if isinstance(v, float) and math.isnan(v) else v for v in page[column]],
+                             [None if isinstance(v, float) and math.isnan(v) else v for v in expected[column]],
+                             column)
+        self.assertEqual(page['title'][0], 'Citizen Kane')
+        self.assertEqual(page['year'], [1941, 1959, 1940, 2013])
+        self.assertEqual(page['gross'], ['$1.59M', 'N/A', '$0.29M', '$56.67M'])
+        self.assertEqual(len(page['image_links']), 4)
+
+    def test_cache_revalidation(self):
+        cache = scrapping_imdb.HttpCache(self.directory)
+        with requests.Session() as session:
+            params = scrapping_imdb.page_params(1)
+            self.assertEqual(cache.get(session, self.url, params), self.content)
+            self.assertEqual(ListPageHandler.statuses, [200])
+            meta, body = cache.load(cache.key(self.url, params))
+            self.assertEqual(body, self.content)
+            self.assertIsNotNone(meta['etag'])
+            # The second request sends If-None-Match and gets the page from the cache
+            self.assertEqual(cache.get(session, self.url, params), self.content)
+            self.assertEqual(ListPageHandler.statuses, [200, 304])
+
+    def test_changed_page(self):
+        cache = scrapping_imdb.HttpCache(self.directory)
+        with requests.Session() as session:
+            cache.get(session, self.url)
+            ListPageHandler.body = self.content.replace(b'Citizen Kane', b'Citizen Kane (Restored)')
+            self.assertEqual(cache.get(session, self.url), ListPageHandler.body)
+            self.assertEqual(ListPageHandler.statuses, [200, 200])
+            self.assertEqual(cache.get(session, self.url), ListPageHandler.body)
+            self.assertEqual(ListPageHandler.statuses, [200, 200, 304])
+
+    def test_fetch_pages(self):
+        cache = scrapping_imdb.HttpCache(self.directory)
+        self.assertEqual(scrapping_imdb.fetch_pages(self.url, [1, 2, 3], cache, workers=3), [self.content] * 3)
+        self.assertEqual(ListPageHandler.statuses, [200] * 3)
+        self.assertEqual(scrapping_imdb.fetch_pages(self.url, [1, 2, 3], cache, workers=3), [self.content] * 3)
+        self.assertEqual(ListPageHandler.statuses, [200] * 3 + [304] * 3)
+
+    def test_scrape(self):
+        data_frame = scrapping_imdb.scrape(self.url, [1, 2], workers=2)
+        self.assertEqual(len(data_frame), 8)
+        self.assertEqual(list(data_frame['Director'][:4]),
+                         ['Orson Welles', 'François Truffaut', 'Charles Chaplin', 'Steve McQueen'])
+
+
+if __name__ == "__main__":
+    unittest.main()
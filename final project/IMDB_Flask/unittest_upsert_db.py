@@ -0,0 +1,208 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app
+import upsert_db
+
+COLUMNS = ['Movie_title', 'Genre', 'Director', 'Actors', 'Duration', 'Year', 'IMDB Rating', 'Meta Score',
+           'Gross earnings', 'Images']
+ROWS = [
+    ['Citizen Kane', 'Drama, Mystery', 'Orson Welles', "['Orson Welles', 'Joseph Cotten', 'Agnes Moorehead']",
+     '119 min', 1941, 8.3, 100.0, '$1.59M', 'http://img/kane.jpg'],
+    ['The Third Man', 'Film-Noir, Mystery', 'Carol Reed', "['Joseph Cotten', 'Orson Welles', 'Alida Valli']",
+     '93 min', 1949, 8.1, 97.0, '$0.45M', 'http://img/third.jpg'],
+    ['The Magnificent Ambersons', 'Drama, Romance', 'Orson Welles', "['Joseph Cotten', 'Dolores Costello']",
+     '88 min', 1942, 7.3, None, 'N/A', 'http://img/ambersons.jpg'],
+    ['Untitled Welles Project', 'Drama', 'Orson Welles', "['Agnes Moorehead']",
+     None, None, None, None, None, None],
+]
+
+create_db = None
+directory = None
+
+
+def setUpModule():
+    # create_db.py builds movies.db and imports imdb.csv from the current directory when it is imported
+    global create_db, directory
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        pd.DataFrame(columns=COLUMNS).to_csv('imdb.csv')
+        import create_db
+    finally:
+        os.chdir(cwd)
+
+
+def tearDownModule():
+    shutil.rmtree(directory)
+
+
+def rows(changes=()):
+    """The test rows as imdb.csv records, with {(title, column): value} changes applied"""
+    records = [dict(zip(COLUMNS, row)) for row in ROWS]
+    for (title, column), value in dict(changes).items():
+        for record in records:
+            if record['Movie_title'] == title:
+                record[column] = value
+    return records
+
+
+def build_database(database, records):
+    """Creates movies.db with the create_db.py schema and imports the records into it"""
+    engine = create_engine('sqlite:///' + database)
+    create_db.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    create_db.bulk_import(session, pd.DataFrame(records, columns=COLUMNS))
+    session.close()
+    engine.dispose()
+
+
+def strip(collaborators):
+    return {person_id: +counts for person_id, counts in collaborators.items() if +counts}
+
+
+class TestUpsert(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = os.path.join(self.directory, 'movies.db')
+        self.change_log = os.path.join(self.directory, 'changes.jsonl')
+        build_database(self.database, rows())
+        self.config = {key: app.app.config[key] for key in ('DATABASE', 'CHANGE_LOG')}
+
+    def tearDown(self):
+        if app.app.config['DATABASE'] != self.config['DATABASE']:
+            app.app.config.update(self.config)
+            app.load_graph()
+        shutil.rmtree(self.directory)
+
+    def query(self, sql, *args):
+        connection = sqlite3.connect(self.database)
+        try:
+            return connection.execute(sql, args).fetchall()
+        finally:
+            connection.close()
+
+    def use_database(self):
+        """Points the app at the test database and loads the graph from it"""
+        app.app.config.update(DATABASE=self.database, CHANGE_LOG=self.change_log)
+        app.load_graph()
+        return app.app.test_client()
+
+    def test_unchanged(self):
+        self.assertEqual(upsert_db.upsert(rows(), self.database, self.change_log), [])
+        self.assertFalse(os.path.exists(self.change_log))
+        self.assertEqual(self.query('SELECT release_date FROM movie WHERE title = ?', 'Untitled Welles Project'),
+                         [(None,)])
+
+    def test_update(self):
+        changes = upsert_db.upsert(rows({('The Third Man', 'Actors'): "['Alida Valli', 'Trevor Howard']",
+                                         ('The Third Man', 'IMDB Rating'): 8.2}),
+                                   self.database, self.change_log)
+        self.assertEqual([(change['op'], change['movie']['title']) for change in changes],
+                         [('update', 'The Third Man')])
+        self.assertEqual(self.query('SELECT average_rating FROM movie WHERE title = ?', 'The Third Man'), [(8.2,)])
+        self.assertEqual(sorted(self.query(
+            'SELECT a.name FROM movie_actors x JOIN actor a ON a.id = x.actor_id JOIN movie m ON m.id = x.movie_id '
+            'WHERE m.title = ?', 'The Third Man')), [('Alida Valli',), ('Trevor Howard',)])
+        # Carol Reed no longer worked with Joseph Cotten
+        self.assertEqual(self.query(
+            'SELECT da.movies FROM director_actors da JOIN director d ON d.id = da.director_id '
+            'JOIN actor a ON a.id = da.actor_id WHERE d.name = ? AND a.name = ?', 'Carol Reed', 'Joseph Cotten'), [])
+        with open(self.change_log) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(upsert_db.upsert(rows({('The Third Man', 'Actors'): "['Alida Valli', 'Trevor Howard']",
+                                                ('The Third Man', 'IMDB Rating'): 8.2}),
+                                          self.database, self.change_log), [])
+
+    def test_change_log_matches_reload(self):
+        client = self.use_database()
+        graph = app.graph
+        new = dict(zip(COLUMNS, ['Touch of Evil', 'Crime, Drama', 'Orson Welles',
+                                 "['Charlton Heston', 'Orson Welles', 'Janet Leigh']",
+                                 '95 min', 1958, 8.0, 99.0, '$2.24M', 'http://img/evil.jpg']))
+        changes = upsert_db.upsert(rows({('Citizen Kane', 'Actors'): "['Orson Welles', 'Ruth Warrick']",
+                                         ('Citizen Kane', 'Genre'): 'Drama'}) + [new],
+                                   self.database, self.change_log)
+        self.assertEqual(sorted(change['op'] for change in changes), ['add', 'update'])
+        self.assertEqual(client.get('/movies').status_code, 200)
+        self.assertIs(app.graph, graph)
+
+        fresh = app.build_graph_from_db(self.database)
+        self.assertEqual(set(graph.nodes), set(fresh.nodes))
+        self.assertEqual(graph.edges, fresh.edges)
+        self.assertEqual(strip(graph.collaborators), strip(fresh.collaborators))
+        for movie_id in fresh.registry[app.Movies]:
+            self.assertEqual(graph.nodes[movie_id].title, fresh.nodes[movie_id].title)
+            self.assertEqual(graph.nodes[movie_id].genre, fresh.nodes[movie_id].genre)
+            self.assertEqual(sorted(person.name for person in graph.nodes[movie_id].actors),
+                             sorted(person.name for person in fresh.nodes[movie_id].actors))
+        self.assertEqual(graph.find(app.Movies, 'Touch of Evil').id, fresh.find(app.Movies, 'Touch of Evil').id)
+
+    def test_truncated_change_log(self):
+        client = self.use_database()
+        upsert_db.upsert(rows({('Citizen Kane', 'Genre'): 'Drama'}), self.database, self.change_log)
+        client.get('/movies')
+        self.assertEqual(app.graph.find(app.Movies, 'Citizen Kane').genre, 'Drama')
+        # A shorter log with other records is read from the start
+        os.remove(self.change_log)
+        upsert_db.upsert(rows({('Citizen Kane', 'Genre'): 'Mystery'}), self.database, self.change_log)
+        client.get('/movies')
+        self.assertEqual(app.graph.find(app.Movies, 'Citizen Kane').genre, 'Mystery')
+
+    def test_concurrent_requests(self):
+        self.use_database()
+        changes = []
+        for genre in ('Drama', 'Mystery', 'Thriller', 'Noir'):
+            changes += upsert_db.upsert(rows({('Citizen Kane', 'Genre'): genre}), self.database, self.change_log)
+        # Every record is applied once, however many requests check the log at the same time
+        with mock.patch.object(app, 'apply_change', wraps=app.apply_change) as apply_change:
+            threads = [threading.Thread(target=app.apply_change_log) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(apply_change.call_count, len(changes))
+        self.assertEqual(app.graph.find(app.Movies, 'Citizen Kane').genre, 'Noir')
+
+    def test_form_add(self):
+        client = self.use_database()
+        response = client.post('/add_movie', data={
+            'title': 'Web Added Movie', 'release_date': '2020-01-01', 'genre': 'Comedy', 'duration': '90 min',
+            'gross_earnings': '', 'image_url': '', 'actors': 'Web Actor', 'directors': '', 'average_rating': ''})
+        self.assertEqual(response.status_code, 302)
+        web_movie = app.graph.find(app.Movies, 'Web Added Movie')
+        web_actor = app.graph.find(app.Actors, 'Web Actor')
+
+        new = dict(zip(COLUMNS, ['Scraped New Movie', 'Western', 'Scraped Director', "['Scraped Actor']",
+                                 '100 min', 2021, 6.5, None, None, None]))
+        self.assertEqual(len(upsert_db.upsert(rows() + [new], self.database, self.change_log)), 1)
+        client.get('/movies')
+
+        # The scraped movie gets its own nodes; the one added through the form is untouched
+        scraped_movie = app.graph.find(app.Movies, 'Scraped New Movie')
+        scraped_actor = app.graph.find(app.Actors, 'Scraped Actor')
+        self.assertIsNotNone(scraped_movie)
+        self.assertIsNotNone(scraped_actor)
+        self.assertNotEqual(scraped_movie.id, web_movie.id)
+        self.assertNotEqual(scraped_actor.id, web_actor.id)
+        self.assertEqual(app.graph.nodes[web_movie.id].genre, 'Comedy')
+        self.assertEqual(app.graph.nodes[web_actor.id].name, 'Web Actor')
+        self.assertEqual([person.name for person in scraped_movie.actors], ['Scraped Actor'])
+        labels = [result['label'] for result in client.get('/search?q=scraped').json['results']]
+        self.assertIn('Scraped New Movie', labels)
+        self.assertIn('Scraped Actor', labels)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Incremental import of scraped rows into movies.db.
+
+Every row is reduced to the fields movies.db stores and fingerprinted. Only
+movies that are new or whose fingerprint changed are written, and every write
+is appended to a change log (one JSON object per line) that the running Flask
+app replays onto its graph.
+
+    python upsert_db.py imdb.csv
+"""
+import ast
+import hashlib
+import json
+import math
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+DATABASE = 'movies.db'
+CHANGE_LOG = 'changes.jsonl'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # how SQLAlchemy stores DateTime columns in SQLite
+
+
+def present(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def parse_names(value):
+    """Parses a list cell such as "['Orson Welles', 'Joseph Cotten']", a list, or a comma separated string."""
+    if not present(value):
+        return []
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            value = value.split(', ')
+        if isinstance(value, str):
+            value = [value]
+    # dict.fromkeys drops a name listed twice for the same movie
+    return list(dict.fromkeys(name.strip() for name in value if name and name.strip()))
+
+
+def normalize(row):
+    """
+    Reduces an imdb.csv row to the fields movies.db stores, or None if it has no title.
+    """
+    if not present(row.get('Movie_title')):
+        return None
+    rating = row.get('IMDB Rating')
+    return {
+        'title': row['Movie_title'],
+        'year': int(row['Year']) if present(row.get('Year')) else None,
+        'average_rating': float(rating) if present(rating) else None,
+        'genre': row.get('Genre') if present(row.get('Genre')) else None,
+        'duration': row.get('Duration') if present(row.get('Duration')) else None,
+        'gross_earnings': row.get('Gross earnings') if present(row.get('Gross earnings')) else None,
+        'image': row.get('Images') if present(row.get('Images')) else None,
+        'directors': parse_names(row.get('Director')),
+        'actors': parse_names(row.get('Actors')),
+    }
+
+
+def fingerprint(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def stored_records(connection):
+    """
+    Reads every movie back as a normalized record, with set-based queries.
+
+    Returns
+    -------
+    dict
+        (title, year) -> (movie id, record)
+    """
+    records = {}
+    by_id = {}
+    for movie_id, title, release_date, rating, genre, duration, gross, image in connection.execute(
+            'SELECT id, title, release_date, average_rating, genre, duration, gross_earnings, image FROM movie'):
+        record = {'title': title, 'year': int(release_date[:4]) if release_date else None,
+                  'average_rating': rating, 'genre': genre, 'duration': duration,
+                  'gross_earnings': gross, 'image': image, 'directors': [], 'actors': []}
+        records[title, record['year']] = (movie_id, record)
+        by_id[movie_id] = record
+    for column, table, key in (('directors', 'movie_directors', 'director'), ('actors', 'movie_actors', 'actor')):
+        for movie_id, name in connection.execute(
+                f'SELECT x.movie_id, p.name FROM {table} x JOIN {key} p ON p.id = x.{key}_id ORDER BY x.rowid'):
+            if movie_id in by_id and name not in by_id[movie_id][column]:
+                by_id[movie_id][column].append(name)
+    return records
+
+
+def upsert(rows, database=DATABASE, change_log=CHANGE_LOG):
+    """
+    Inserts new movies and rewrites changed ones, in one transaction.
+
+    Parameters
+    ----------
+    rows : iterable of dict
+        Rows with the columns of imdb.csv, e.g. ``data_frame.to_dict('records')``.
+    database : str, optional
+        The SQLite database written by create_db.py.
+    change_log : str, optional
+        The file the changes are appended to; None to skip the log.
+
+    Returns
+    -------
+    list of dict
+        The changes, ``{'op': 'add' or 'update', 'movie': {...}}``, as written to the log.
+    """
+    records = {}
+    for row in rows:
+        record = normalize(row)
+        if record is not None:
+            records[record['title'], record['year']] = record
+
+    connection = sqlite3.connect(database)
+    changes = []
+    try:
+        with connection:
+            stored = stored_records(connection)
+            people = {table: dict(connection.execute(f'SELECT name, id FROM {table} ORDER BY id DESC'))
+                      for table in ('actor', 'director')}
+            next_id = {table: (connection.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+                       for table in ('movie', 'actor', 'director')}
+            new_people = {'actor': [], 'director': []}
+            new_movies, updated_movies, links = [], [], {'actor': [], 'director': []}
+
+            def person_id(table, name):
+                if name not in people[table]:
+                    people[table][name] = next_id[table]
+                    next_id[table] += 1
+                    new_people[table].append((people[table][name], name))
+                return people[table][name]
+
+            for key, record in records.items():
+                movie_id, old = stored.get(key, (None, None))
+                if old is not None and fingerprint(old) == fingerprint(record):
+                    continue
+                release_date = datetime(record['year'], 1, 1).strftime(DATE_FORMAT) if record['year'] else None
+                values = (record['title'], release_date, record['average_rating'], record['genre'],
+                          record['duration'], record['gross_earnings'], record['image'])
+                if old is None:
+                    movie_id = next_id['movie']
+                    next_id['movie'] += 1
+                    new_movies.append((movie_id,) + values)
+                else:
+                    updated_movies.append(values + (movie_id,))
+                movie = dict(record, id=movie_id)
+                for column, table in (('actors', 'actor'), ('directors', 'director')):
+                    movie[column] = [{'id': person_id(table, name), 'name': name} for name in record[column]]
+                    links[table] += [(movie_id, person['id']) for person in movie[column]]
+                changes.append({'op': 'add' if old is None else 'update', 'movie': movie})
+
+            for table in ('actor', 'director'):
+                connection.executemany(f'INSERT INTO {table} (id, name, {table}) VALUES (?, ?, 1)',
+                                       new_people[table])
+            connection.executemany(
+                'INSERT INTO movie (id, title, release_date, average_rating, genre, duration, gross_earnings, image) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', new_movies)
+            connection.executemany(
+                'UPDATE movie SET title = ?, release_date = ?, average_rating = ?, genre = ?, duration = ?, '
+                'gross_earnings = ?, image = ? WHERE id = ?', updated_movies)
+            for table in ('actor', 'director'):
+                connection.executemany(f'DELETE FROM movie_{table}s WHERE movie_id = ?',
+                                       [(values[-1],) for values in updated_movies])
+                connection.executemany(f'INSERT INTO movie_{table}s (movie_id, {table}_id) VALUES (?, ?)',
+                                       links[table])
+            if changes and connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'director_actors'").fetchone():
+                connection.execute('DELETE FROM director_actors')
+                connection.execute(
+                    'INSERT INTO director_actors (director_id, actor_id, movies) '
+                    'SELECT d.director_id, a.actor_id, COUNT(DISTINCT a.movie_id) FROM movie_directors d '
+                    'JOIN movie_actors a ON a.movie_id = d.movie_id GROUP BY d.director_id, a.actor_id')
+    finally:
+        connection.close()
+
+    # Only log what was committed
+    if change_log is not None and changes:
+        with open(change_log, 'a') as f:
+            for change in changes:
+                f.write(json.dumps(change) + '\n')
+    return changes
+
+
+if __name__ == '__main__':
+    data = pd.read_csv(sys.argv[1] if len(sys.argv) > 1 else 'imdb.csv')
+    changes = upsert(data.to_dict('records'))
+    print(f"{sum(change['op'] == 'add' for change in changes)} added, "
+          f"{sum(change['op'] == 'update' for change in changes)} updated")